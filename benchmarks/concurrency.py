@@ -0,0 +1,62 @@
+# Requests/sec benchmark at increasing client concurrency.
+#
+# Start the API (uvicorn main:app --workers 1) against a seeded MongoDB, then run:
+#   python -m benchmarks.concurrency --url http://localhost:8000 --path /question/questions
+# Run it once on the old sync build and once on the async build to compare.
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+DEFAULT_CONCURRENCY = [50, 100, 200]
+
+async def _client_loop(client: httpx.AsyncClient, path: str, deadline: float, counts: dict):
+    while time.perf_counter() < deadline:
+        try:
+            response = await client.get(path)
+            if response.status_code < 500:
+                counts["ok"] += 1
+            else:
+                counts["errors"] += 1
+        except httpx.HTTPError:
+            counts["errors"] += 1
+
+async def run_level(url: str, path: str, concurrency: int, duration: float) -> dict:
+    counts = {"ok": 0, "errors": 0}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*(_client_loop(client, path, deadline, counts) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": counts["ok"],
+        "errors": counts["errors"],
+        "rps": round(counts["ok"] / elapsed, 1),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure requests/sec at several concurrency levels")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/question/questions")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    for level in args.concurrency:
+        result = await run_level(args.url, args.path, level, args.duration)
+        print(f"{level:>5} clients  {result['rps']:>9} req/s  ({result['errors']} errors)")
+        results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"path": args.path, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
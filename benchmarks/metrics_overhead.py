@@ -0,0 +1,70 @@
+# Instrumentation overhead of config/metrics.py, no database needed.
+#
+# HTTP: the same route table (every router of the API plus a trivial /ping registered last, so template lookup
+# scans the whole table) served with and without MetricsMiddleware, driven in-process through httpx.
+# Mongo: the command listener fed synthetic started/succeeded event pairs.
+#   python -m benchmarks.metrics_overhead --requests 5000 --commands 200000
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+
+import httpx
+from fastapi import FastAPI
+
+from config.metrics import MetricsMiddleware, MongoCommandMetrics
+from router import answer_router, job_router, question_router, user_router
+
+def build_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    app.include_router(user_router, prefix="/user")
+    app.include_router(question_router, prefix="/question")
+    app.include_router(answer_router, prefix="/answer")
+    app.include_router(job_router, prefix="/jobs")
+
+    @app.get("/ping")
+    async def ping():
+        return {}
+
+    return app
+
+async def time_requests(app: FastAPI, requests: int, rounds: int) -> float:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get("/ping")  # warm-up: builds the OpenAPI route table once
+        per_round = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for _ in range(requests):
+                await client.get("/ping")
+            per_round.append((time.perf_counter() - started) / requests * 1_000_000)
+    return statistics.median(per_round)
+
+def time_listener(commands: int) -> float:
+    listener = MongoCommandMetrics()
+    started_event = SimpleNamespace(command_name="find", command={"find": "questions"}, connection_id=("localhost", 27017), request_id=1)
+    reply = {"cursor": {"firstBatch": [{}] * 20, "id": 0}, "ok": 1}
+    succeeded_event = SimpleNamespace(command_name="find", connection_id=("localhost", 27017), request_id=1, duration_micros=850, reply=reply)
+
+    started = time.perf_counter()
+    for _ in range(commands):
+        listener.started(started_event)
+        listener.succeeded(succeeded_event)
+    return (time.perf_counter() - started) / commands * 1_000_000
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the overhead of the metrics instrumentation")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--commands", type=int, default=200_000)
+    args = parser.parse_args()
+
+    bare = asyncio.run(time_requests(build_app(False), args.requests, args.rounds))
+    instrumented = asyncio.run(time_requests(build_app(True), args.requests, args.rounds))
+    print(f"http request   bare {bare:8.1f} us   instrumented {instrumented:8.1f} us   overhead {instrumented - bare:6.1f} us")
+    print(f"mongo command  listener {time_listener(args.commands):6.2f} us per started/succeeded pair")
+
+if __name__ == "__main__":
+    main()
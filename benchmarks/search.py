@@ -0,0 +1,110 @@
+# Relevance and latency benchmark for GET /question/search on a synthetic corpus.
+#
+# Seeds a separate database with N filler questions plus planted "topic" questions, builds the
+# registered indexes and runs the search pipeline directly:
+#   python -m benchmarks.search --size 1000000 --queries 200
+# Each topic term appears in the title of `--relevant` questions and only in the content of
+# `--distractors` others, so precision@10 measures whether title matches outrank content matches.
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import MongoClient
+
+from config.database import MONGO_URL
+from config.indexes import INDEXES
+from utils.search import search_pipeline
+
+WORDS = [
+    "python", "java", "async", "mongo", "index", "query", "react", "docker", "linux", "kernel",
+    "thread", "memory", "cache", "network", "socket", "parser", "compiler", "regex", "string", "array",
+    "sort", "graph", "tree", "hash", "matrix", "vector", "lambda", "closure", "class", "module",
+]
+TAGS = ["python", "javascript", "databases", "devops", "algorithms", "web", "systems", "math"]
+
+def filler(rng: random.Random, now: datetime) -> dict:
+    return {
+        "title": " ".join(rng.choices(WORDS, k=8)),
+        "content": " ".join(rng.choices(WORDS, k=60)),
+        "tags": rng.sample(TAGS, 2),
+        "authorId": "000000000000000000000000",
+        "createdAt": now,
+        "answers": [],
+    }
+
+def seed(database, size: int, topics: int, relevant: int, distractors: int, seed_value: int):
+    rng = random.Random(seed_value)
+    now = datetime.now()
+    database.questions.drop()
+
+    batch = []
+    for _ in range(size):
+        batch.append(filler(rng, now))
+        if len(batch) == 10_000:
+            database.questions.insert_many(batch, ordered=False)
+            batch = []
+
+    for topic in range(topics):
+        term = f"topic{topic:05d}"
+        for _ in range(relevant):
+            doc = filler(rng, now)
+            doc["title"] = f"{term} {doc['title']}"
+            doc["planted"] = term
+            batch.append(doc)
+        for _ in range(distractors):
+            doc = filler(rng, now)
+            doc["content"] = f"{doc['content']} {term}"
+            batch.append(doc)
+    if batch:
+        database.questions.insert_many(batch, ordered=False)
+
+    database.questions.create_indexes(INDEXES["questions"])
+
+def run(database, topics: int, queries: int, seed_value: int):
+    rng = random.Random(seed_value)
+    latencies = []
+    precisions = []
+
+    for _ in range(queries):
+        term = f"topic{rng.randrange(topics):05d}"
+        started = time.perf_counter()
+        result = next(database.questions.aggregate(search_pipeline(term, None, 0, 10)))
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        top = result["items"][:10]
+        ids = [ObjectId(doc["id"]) for doc in top]
+        planted = database.questions.count_documents({"planted": term, "_id": {"$in": ids}})
+        precisions.append(planted / max(len(top), 1))
+
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "precision_at_10": round(statistics.mean(precisions), 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Search relevance and latency benchmark")
+    parser.add_argument("--db", default="edushare_bench_search")
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--relevant", type=int, default=10)
+    parser.add_argument("--distractors", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the corpus from a previous run")
+    args = parser.parse_args()
+
+    database = MongoClient(MONGO_URL)[args.db]
+    if not args.skip_seed:
+        started = time.perf_counter()
+        seed(database, args.size, args.topics, args.relevant, args.distractors, args.seed)
+        print(f"seeded {database.questions.estimated_document_count()} questions in {time.perf_counter() - started:.0f}s")
+
+    print(run(database, args.topics, args.queries, args.seed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# Serialization microbenchmark for the list endpoints, no database needed.
+#
+# For each endpoint, builds one page of synthetic documents and times turning it into response bytes two ways:
+#   legacy: raw documents (ObjectId `_id`) -> per-document Python rewrite -> response_model validation
+#           -> jsonable_encoder -> JSONResponse
+#   fast:   documents as the `id_projection` find returns them -> JSONBytesResponse (orjson)
+#   python -m benchmarks.serialization --size 100 --repeat 200
+# Peak allocations come from tracemalloc on a single extra run, so they are not skewed by the timing loop.
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from models.AnswerModel import AnswerDetail
+from utils.serialization import JSONBytesResponse
+
+WORDS = ["python", "mongo", "index", "query", "async", "cache", "thread", "socket", "parser", "regex"]
+
+def text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(WORDS, k=words))
+
+def raw_question(rng: random.Random, now: datetime) -> dict:
+    return {
+        "_id": ObjectId(), "title": text(rng, 8), "content": text(rng, 80), "tags": rng.sample(WORDS, 3),
+        "authorId": str(ObjectId()), "authorName": "bench", "createdAt": now - timedelta(seconds=rng.randrange(10**6)),
+        "answers": [str(ObjectId()) for _ in range(rng.randrange(10))],
+    }
+
+def raw_answer(rng: random.Random, now: datetime) -> dict:
+    return {
+        "_id": ObjectId(), "content": text(rng, 60), "questionId": str(ObjectId()), "authorId": str(ObjectId()),
+        "authorName": "bench", "createdAt": now - timedelta(seconds=rng.randrange(10**6)),
+        "upvotes": rng.randrange(100), "isBestAnswer": False,
+    }
+
+def raw_user(rng: random.Random, now: datetime) -> dict:
+    return {
+        "_id": ObjectId(), "username": text(rng, 1), "email": "bench@bench.local", "reputation": rng.randrange(100),
+        "joinDate": now, "bio": text(rng, 20), "questions": [str(ObjectId()) for _ in range(5)],
+        "answers": [str(ObjectId()) for _ in range(20)],
+    }
+
+# What the endpoint's find projection hands back: `_id` already converted to a string `id` by Mongo
+def projected(documents: List[dict], fields: Optional[Tuple[str, ...]]) -> List[dict]:
+    result = []
+    for doc in documents:
+        doc = {key: value for key, value in doc.items() if fields is None or key in fields or key == "_id"}
+        doc["id"] = str(doc.pop("_id"))
+        result.append(doc)
+    return result
+
+def legacy_response(content: Any, model: Any) -> bytes:
+    validated = TypeAdapter(model).validate_python(content)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+def legacy_questions(documents: List[dict]) -> bytes:
+    items = []
+    for doc in documents:
+        doc = dict(doc)
+        doc["id"] = str(doc.pop("_id"))
+        doc["answers"] = [str(answer) for answer in doc["answers"]]
+        items.append(doc)
+    return legacy_response({"items": items, "next_cursor": None}, dict)
+
+def legacy_answers_page(documents: List[dict]) -> bytes:
+    items = []
+    for doc in documents:
+        doc = dict(doc)
+        doc["id"] = str(doc["_id"])
+        del doc["_id"]
+        items.append(doc)
+    return legacy_response({"items": items, "next_cursor": None}, dict)
+
+def legacy_all_answers(documents: List[dict]) -> bytes:
+    items = []
+    for doc in documents:
+        doc = dict(doc)
+        doc["id"] = str(doc["_id"])
+        doc["questionId"] = str(doc["questionId"])
+        doc["authorId"] = str(doc["authorId"])
+        del doc["_id"]
+        items.append(doc)
+    return legacy_response(items, List[AnswerDetail])
+
+def legacy_all_users(documents: List[dict]) -> bytes:
+    items = [
+        {
+            "id": str(user["_id"]), "username": user["username"], "email": user["email"],
+            "reputation": user.get("reputation", 0), "joinDate": user.get("joinDate"), "bio": user.get("bio", ""),
+            "questions": [str(q) for q in user.get("questions", [])], "answers": [str(a) for a in user.get("answers", [])],
+        }
+        for user in documents
+    ]
+    return legacy_response(items, List[dict])
+
+def fast_page(documents: List[dict]) -> bytes:
+    return JSONBytesResponse({"items": documents, "next_cursor": None}).body
+
+def fast_list(documents: List[dict]) -> bytes:
+    return JSONBytesResponse(documents).body
+
+# (endpoint, document factory, fields kept by the endpoint's projection, legacy path, fast path)
+ENDPOINTS = [
+    ("GET /question/questions", raw_question, None, legacy_questions, fast_page),
+    ("GET /answer/answers/question/{id}", raw_answer, None, legacy_answers_page, fast_page),
+    ("GET /answer/answers", raw_answer, tuple(AnswerDetail.model_fields), legacy_all_answers, fast_list),
+    ("GET /user/", raw_user, None, legacy_all_users, fast_list),
+]
+
+def measure(serialize: Callable[[List[dict]], bytes], documents: List[dict], repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        serialize(documents)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    serialize(documents)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"median_ms": round(statistics.median(timings), 3), "peak_kib": round(peak / 1024, 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description="List endpoint serialization microbenchmark")
+    parser.add_argument("--size", type=int, default=100, help="Documents per response")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = datetime.now()
+    for endpoint, factory, fields, legacy, fast in ENDPOINTS:
+        raw = [factory(rng, now) for _ in range(args.size)]
+        documents = projected(raw, fields)
+        # Both paths must produce the same JSON document, key order aside
+        if json.loads(legacy(raw)) != json.loads(fast(documents)):
+            raise SystemExit(f"{endpoint}: legacy and fast responses differ")
+
+        before = measure(legacy, raw, args.repeat)
+        after = measure(fast, documents, args.repeat)
+        speedup = before["median_ms"] / max(after["median_ms"], 1e-9)
+        print(f"{endpoint:36} legacy {before}  fast {after}  x{speedup:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# Load-test and latency benchmark for every route in main.app.
+#
+# Seeds a scratch database with a synthetic dataset, then sends a fixed number of requests to each endpoint at a
+# controlled concurrency and reports throughput, p50/p95/p99 latency and MongoDB commands per request:
+#   python -m benchmarks.suite --db edushare_bench --requests 300 --concurrency 32 --output bench.json
+#   python -m benchmarks.suite --db edushare_bench --baseline bench.json --fail-on-regression
+# By default the app runs in-process through httpx.ASGITransport, and a pymongo CommandListener counts the commands
+# each endpoint issues. With --url the requests go to a running server instead (start it with the same MONGO_DB);
+# Mongo ops are then not reported. In-process, background tasks finish inside the request, so the delete endpoints
+# include their cascade in the measured latency.
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from bson import ObjectId
+from pymongo import monitoring
+
+PASSWORD = "bench-password"
+WORDS = [
+    "python", "java", "async", "mongo", "index", "query", "react", "docker", "linux", "kernel",
+    "thread", "memory", "cache", "network", "socket", "parser", "compiler", "regex", "string", "array",
+]
+TAGS = ["python", "javascript", "databases", "devops", "algorithms", "web", "systems", "math"]
+BATCH_ITEMS = 20
+USER_BATCH_ITEMS = 5
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+def text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(WORDS, k=words))
+
+# Seeding: regular content plus one "pool" document per request for every endpoint that consumes its target
+def seed(database, users: int, questions: int, answers_per_question: int, pool: int, seed_value: int) -> dict:
+    from config.auth import hash_password
+    from config.indexes import ensure_indexes_sync
+    from utils.tags import rebuild_tag_stats
+
+    rng = random.Random(seed_value)
+    for collection in ("users", "questions", "answers", "votes", "tags", "jobs"):
+        database[collection].drop()
+    ensure_indexes_sync(database)
+
+    now = datetime.now()
+    password_hash = hash_password(PASSWORD)
+    user_docs = [
+        {
+            "_id": ObjectId(), "username": f"user{i}", "email": f"user{i}@example.com", "passwordHash": password_hash,
+            "reputation": 0, "joinDate": now, "bio": "", "questionCount": 0, "answerCount": 0,
+        }
+        for i in range(users + pool)
+    ]
+    authors = user_docs[:users]
+
+    question_docs = []
+    for i in range(questions + pool):
+        author = rng.choice(authors)
+        question_docs.append({
+            "_id": ObjectId(), "title": text(rng, 8), "content": text(rng, 60), "tags": rng.sample(TAGS, 2),
+            "authorId": str(author["_id"]), "authorName": author["username"],
+            "createdAt": now - timedelta(seconds=i), "answers": [], "answerCount": 0, "version": 1,
+        })
+        author["questionCount"] += 1
+
+    answer_docs = []
+    targets = question_docs * answers_per_question + question_docs[:pool]
+    for i, question in enumerate(targets):
+        author = rng.choice(authors)
+        answer_docs.append({
+            "_id": ObjectId(), "content": text(rng, 40), "questionId": str(question["_id"]),
+            "authorId": str(author["_id"]), "authorName": author["username"],
+            "createdAt": now - timedelta(seconds=i), "upvotes": 0, "isBestAnswer": False, "version": 1,
+        })
+        author["answerCount"] += 1
+        question["answers"].append(str(answer_docs[-1]["_id"]))
+        question["answerCount"] += 1
+
+    database.users.insert_many(user_docs, ordered=False)
+    database.questions.insert_many(question_docs, ordered=False)
+    database.answers.insert_many(answer_docs, ordered=False)
+    rebuild_tag_stats(database)
+    job_id = database.jobs.insert_one({
+        "type": "delete_question", "targetId": str(ObjectId()), "status": "done", "total": 0, "processed": 0,
+        "error": None, "createdAt": now, "finishedAt": now,
+    }).inserted_id
+
+    return {
+        "users": [str(user["_id"]) for user in authors],
+        "usernames": [user["username"] for user in authors],
+        "pool_users": [str(user["_id"]) for user in user_docs[users:]],
+        "questions": [str(question["_id"]) for question in question_docs[:questions]],
+        "question_authors": [question["authorId"] for question in question_docs[:questions]],
+        "pool_questions": [str(question["_id"]) for question in question_docs[questions:]],
+        "answers": [str(answer["_id"]) for answer in answer_docs[:len(answer_docs) - pool]],
+        "pool_answers": [str(answer["_id"]) for answer in answer_docs[len(answer_docs) - pool:]],
+        "job": str(job_id),
+        "run": ObjectId(),
+    }
+
+def pick(ctx: dict, key: str, i: int) -> str:
+    return ctx[key][i % len(ctx[key])]
+
+# Distinct (voter, target user) pair for every request index, so no vote is rejected as a duplicate
+def user_pair(ctx: dict, i: int):
+    users = ctx["users"]
+    return users[i % len(users)], users[(i + 1 + i // len(users)) % len(users)]
+
+# Distinct (voter, answer) pair for every request index
+def answer_pair(ctx: dict, i: int):
+    users = ctx["users"]
+    return users[i % len(users)], ctx["answers"][(i // len(users)) % len(ctx["answers"])]
+
+def new_question(ctx: dict, i: int) -> dict:
+    author = pick(ctx, "users", i)
+    return {"title": f"bench question {i}", "content": "benchmark content", "tags": TAGS[i % 3:i % 3 + 2], "authorId": author}
+
+def new_answer(ctx: dict, i: int) -> dict:
+    return {"content": f"bench answer {i}", "questionId": pick(ctx, "questions", i), "authorId": pick(ctx, "users", i + 1)}
+
+def new_user(ctx: dict, i: int) -> dict:
+    name = f"bench-{ctx['run']}-{i}"
+    return {"username": name, "email": f"{name}@example.com", "password": PASSWORD}
+
+# (method, route path as declared in main.app, request builder) in run order: reads, writes, votes, deletes.
+# A query string after the path names a variant of that route, reported as its own line.
+SCENARIOS = [
+    ("GET", "/user/", lambda ctx, i: ("/user/", {})),
+    ("GET", "/user/me", lambda ctx, i: ("/user/me", {"headers": {"Authorization": f"Bearer {ctx['token']}"}})),
+    ("GET", "/user/{user_id}", lambda ctx, i: (f"/user/{pick(ctx, 'users', i)}", {})),
+    ("GET", "/user/{user_id}/activity", lambda ctx, i: (f"/user/{pick(ctx, 'users', i)}/activity", {})),
+    ("GET", "/question/questions", lambda ctx, i: ("/question/questions", {})),
+    ("GET", "/question/questions?view=summary", lambda ctx, i: ("/question/questions", {"params": {"view": "summary"}})),
+    ("GET", "/question/questions/{question_id}", lambda ctx, i: (f"/question/questions/{pick(ctx, 'questions', i)}", {})),
+    ("GET", "/question/questions/user/{user_id}", lambda ctx, i: (f"/question/questions/user/{pick(ctx, 'users', i)}", {})),
+    ("GET", "/question/questions/user/{user_id}?view=summary", lambda ctx, i: (
+        f"/question/questions/user/{pick(ctx, 'users', i)}", {"params": {"view": "summary"}},
+    )),
+    ("GET", "/question/questions/details/{question_id}", lambda ctx, i: (f"/question/questions/details/{pick(ctx, 'questions', i)}", {})),
+    ("GET", "/question/search", lambda ctx, i: ("/question/search", {"params": {"q": WORDS[i % len(WORDS)]}})),
+    ("GET", "/question/tags", lambda ctx, i: ("/question/tags", {"params": {"prefix": TAGS[i % len(TAGS)][:2]} if i % 2 else {}})),
+    ("GET", "/question/tags/{tag}", lambda ctx, i: (f"/question/tags/{TAGS[i % len(TAGS)]}", {})),
+    ("GET", "/answer/answers", lambda ctx, i: ("/answer/answers", {})),
+    ("GET", "/answer/answers/{answer_id}", lambda ctx, i: (f"/answer/answers/{pick(ctx, 'answers', i)}", {})),
+    ("GET", "/answer/answers/question/{question_id}", lambda ctx, i: (f"/answer/answers/question/{pick(ctx, 'questions', i)}", {})),
+    ("GET", "/jobs/{job_id}", lambda ctx, i: (f"/jobs/{ctx['job']}", {})),
+    ("POST", "/user/lookup", lambda ctx, i: ("/user/lookup", {"json": [pick(ctx, "users", i + j) for j in range(BATCH_ITEMS)]})),
+    ("POST", "/question/questions/lookup", lambda ctx, i: (
+        "/question/questions/lookup", {"json": [pick(ctx, "questions", i + j) for j in range(BATCH_ITEMS)]},
+    )),
+    ("POST", "/answer/answers/lookup", lambda ctx, i: (
+        "/answer/answers/lookup", {"json": [pick(ctx, "answers", i + j) for j in range(BATCH_ITEMS)]},
+    )),
+    ("POST", "/user/login", lambda ctx, i: ("/user/login", {"json": {"username": pick(ctx, "usernames", i), "password": PASSWORD}})),
+    ("POST", "/user/register", lambda ctx, i: ("/user/register", {"json": new_user(ctx, i)})),
+    ("POST", "/user/batch", lambda ctx, i: ("/user/batch", {"json": [new_user(ctx, f"{i}-{j}") for j in range(USER_BATCH_ITEMS)]})),
+    ("PUT", "/user/{user_id}", lambda ctx, i: (f"/user/{pick(ctx, 'users', i)}", {"json": {
+        "username": pick(ctx, "usernames", i), "email": f"{pick(ctx, 'usernames', i)}@example.com", "bio": f"bio {i}",
+    }})),
+    ("POST", "/question/questions", lambda ctx, i: ("/question/questions", {"json": new_question(ctx, i)})),
+    ("POST", "/question/questions/batch", lambda ctx, i: ("/question/questions/batch", {"json": [new_question(ctx, i + j) for j in range(BATCH_ITEMS)]})),
+    ("PUT", "/question/questions/{question_id}", lambda ctx, i: (f"/question/questions/{pick(ctx, 'questions', i)}", {"json": {
+        "authorId": pick(ctx, "question_authors", i), "title": f"edited {i}",
+    }})),
+    ("POST", "/answer/answers", lambda ctx, i: ("/answer/answers", {"json": new_answer(ctx, i)})),
+    ("POST", "/answer/answers/batch", lambda ctx, i: ("/answer/answers/batch", {"json": [new_answer(ctx, i + j) for j in range(BATCH_ITEMS)]})),
+    ("PUT", "/answer/answers/{answer_id}", lambda ctx, i: (f"/answer/answers/{pick(ctx, 'answers', i)}", {"json": {"content": f"edited {i}"}})),
+    ("PUT", "/user/{user_id}/reputation/{target_user_id}", lambda ctx, i: ("/user/{}/reputation/{}".format(*user_pair(ctx, i)), {})),
+    ("PUT", "/user/{user_id}/revoke/{target_user_id}", lambda ctx, i: ("/user/{}/revoke/{}".format(*user_pair(ctx, i)), {})),
+    ("PUT", "/answer/{user_id}/upvote/answer/{answer_id}", lambda ctx, i: ("/answer/{}/upvote/answer/{}".format(*answer_pair(ctx, i)), {})),
+    ("PUT", "/answer/{user_id}/revoke/answer/{answer_id}", lambda ctx, i: ("/answer/{}/revoke/answer/{}".format(*answer_pair(ctx, i)), {})),
+    ("DELETE", "/answer/answers/{answer_id}", lambda ctx, i: (f"/answer/answers/{pick(ctx, 'pool_answers', i)}", {})),
+    ("DELETE", "/question/questions/{question_id}", lambda ctx, i: (f"/question/questions/{pick(ctx, 'pool_questions', i)}", {})),
+    ("DELETE", "/user/{user_id}", lambda ctx, i: (f"/user/{pick(ctx, 'pool_users', i)}", {})),
+]
+
+# Utility: Nearest-rank percentile of an already sorted list
+def percentile(values: list, pct: float) -> float:
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+async def run_scenario(client, counter, ctx, method, build, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    indexes = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in indexes:
+            path, kwargs = build(ctx, i)
+            started = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    ops_before = counter.count if counter else 0
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mongo_ops_per_request": round((counter.count - ops_before) / requests, 2) if counter else None,
+    }
+
+# Utility: Warn about routes without a scenario; read from the OpenAPI schema, which lists every included
+# route with its full path however the routers are nested
+def check_coverage(app):
+    declared = {(method.upper(), path) for path, operations in app.openapi()["paths"].items() for method in operations}
+    missing = declared - {(method, path) for method, path, _ in SCENARIOS}
+    for method, path in sorted(missing):
+        print(f"warning: no scenario for {method} {path}", file=sys.stderr)
+
+# Utility: Print per-endpoint changes against a baseline run; returns the endpoints that regressed
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    print(f"\n{'endpoint':58} {'p99 ms':>20} {'req/s':>20}")
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            print(f"{name:58} {'(new)':>20}")
+            continue
+        p99_change = (result["p99_ms"] - before["p99_ms"]) / max(before["p99_ms"], 1e-9) * 100
+        rps_change = (result["rps"] - before["rps"]) / max(before["rps"], 1e-9) * 100
+        regressed = p99_change > threshold or rps_change < -threshold
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:58} {before['p99_ms']:>8} -> {result['p99_ms']:<8} {before['rps']:>8} -> {result['rps']:<8}{flag}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+async def run(args, counter) -> dict:
+    from config.database import get_sync_db
+
+    ctx = seed(get_sync_db(), args.users, args.questions, args.answers_per_question, args.requests, args.seed)
+
+    if args.url:
+        transport, base_url, lifespan = None, args.url, contextlib.nullcontext()
+    else:
+        from main import app
+
+        check_coverage(app)
+        # ASGITransport sends no lifespan events, so the app's startup (MongoDB client, indexes) is entered here
+        transport, base_url = httpx.ASGITransport(app=app, raise_app_exceptions=False), "http://bench"
+        lifespan = app.router.lifespan_context(app)
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with lifespan, httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=120) as client:
+        login = await client.post("/user/login", json={"username": ctx["usernames"][0], "password": PASSWORD})
+        login.raise_for_status()
+        ctx["token"] = login.json()["access_token"]
+
+        results = {}
+        for method, path, build in SCENARIOS:
+            name = f"{method} {path}"
+            if args.only and not any(part in name for part in args.only):
+                continue
+            result = await run_scenario(client, counter, ctx, method, build, args.requests, args.concurrency)
+            ops = result["mongo_ops_per_request"]
+            print(f"{name:58} {result['rps']:>8} req/s  p50 {result['p50_ms']:>8}  p95 {result['p95_ms']:>8}  "
+                  f"p99 {result['p99_ms']:>8} ms  ops {ops if ops is not None else '-':>6}  errors {result['errors']}")
+            results[name] = result
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every endpoint of the API")
+    parser.add_argument("--db", default="edushare_bench", help="Scratch database; it is dropped and reseeded")
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--answers-per-question", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=300, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="+", help="Run only endpoints whose 'METHOD path' contains one of these")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON output of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    if args.db == "edushare":
+        parser.error("refusing to drop and reseed the application database")
+
+    # Both must be in place before config.database creates its clients
+    counter = None if args.url else CommandCounter()
+    if counter:
+        monitoring.register(counter)
+    os.environ["MONGO_DB"] = args.db
+
+    results = asyncio.run(run(args, counter))
+    report = {
+        "created": datetime.now().isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "fail_on_regression")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Concurrency stress test and latency benchmark for answer upvotes.
+#
+# Seeds N voter accounts and one answer straight into MongoDB, fires every upvote in parallel
+# against a running API, then checks that no increment was lost:
+#   python -m benchmarks.voting --url http://localhost:8000 --voters 500
+# Run it against the old read-modify-write build and the atomic build to compare latency.
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import httpx
+from bson import ObjectId
+
+from config.database import get_sync_db
+
+def seed(database, voters: int):
+    run_id = ObjectId()
+    author_id = database.users.insert_one({
+        "username": f"bench-author-{run_id}", "email": f"author-{run_id}@bench.local",
+        "reputation": 0, "joinDate": datetime.now(), "bio": "", "questions": [], "answers": [],
+    }).inserted_id
+    question_id = database.questions.insert_one({
+        "title": "Voting benchmark", "content": "", "tags": [], "authorId": str(author_id),
+        "createdAt": datetime.now(), "answers": [],
+    }).inserted_id
+    answer_id = database.answers.insert_one({
+        "content": "Voting benchmark", "questionId": str(question_id), "authorId": str(author_id),
+        "createdAt": datetime.now(), "upvotes": 0, "isBestAnswer": False,
+    }).inserted_id
+    voter_ids = database.users.insert_many([
+        {"username": f"bench-voter-{run_id}-{i}", "email": f"voter-{run_id}-{i}@bench.local",
+         "reputation": 0, "joinDate": datetime.now(), "bio": "", "questions": [], "answers": []}
+        for i in range(voters)
+    ]).inserted_ids
+    return str(answer_id), [str(v) for v in voter_ids], [author_id, *voter_ids], question_id
+
+def cleanup(database, answer_id: str, user_ids: list, question_id):
+    database.answers.delete_one({"_id": ObjectId(answer_id)})
+    database.questions.delete_one({"_id": question_id})
+    database.users.delete_many({"_id": {"$in": user_ids}})
+    database.votes.delete_many({"targetType": "answer", "targetId": answer_id})
+
+async def vote_all(url: str, answer_id: str, voter_ids: list, concurrency: int) -> list:
+    latencies = []
+    limits = httpx.Limits(max_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def vote(voter_id: str):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.put(f"/answer/{voter_id}/upvote/answer/{answer_id}")
+                latencies.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+
+        await asyncio.gather(*(vote(voter_id) for voter_id in voter_ids))
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel upvote stress test")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--voters", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    database = get_sync_db()
+    answer_id, voter_ids, user_ids, question_id = seed(database, args.voters)
+    try:
+        latencies = asyncio.run(vote_all(args.url, answer_id, voter_ids, args.concurrency))
+        upvotes = database.answers.find_one({"_id": ObjectId(answer_id)})["upvotes"]
+    finally:
+        cleanup(database, answer_id, user_ids, question_id)
+
+    latencies.sort()
+    print(f"votes sent: {len(voter_ids)}  upvotes stored: {upvotes}")
+    print(f"latency ms  p50={statistics.median(latencies):.1f}  "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:.1f}  max={latencies[-1]:.1f}")
+
+    if upvotes != len(voter_ids):
+        print(f"LOST UPDATES: {len(voter_ids) - upvotes}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,79 @@
+import asyncio
+import hashlib
+import os
+import time
 import bcrypt
+from concurrent.futures import ThreadPoolExecutor
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Union
+from utils.cache import TTLCache
+from config.metrics import PASSWORD_PENDING, PASSWORD_SECONDS, register_cache
 
 SECRET_KEY = "dolbaeb"  # Change this to a strong secret key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Password hashing settings
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # Work factor; existing hashes are upgraded on login
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "4"))  # Threads running bcrypt (it releases the GIL)
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "64"))  # Max queued + running operations
+
+# Already-verified tokens, keyed by token digest and expiring at the token's own `exp`
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+_verified_tokens = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+register_cache("verified_tokens", _verified_tokens)
+
+_password_pool = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+_pending_password_ops = 0
+PASSWORD_PENDING.set_function(lambda: _pending_password_ops)
+
+class PasswordHasherBusy(Exception):
+    pass
+
 # Hash password
 def hash_password(password: str) -> str:
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    with PASSWORD_SECONDS.labels("hash").time():
+        salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 # Verify password
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
         # Check if the given plain password matches the hashed password
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        with PASSWORD_SECONDS.labels("verify").time():
+            return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
     except ValueError as e:
         raise ValueError("This") from e
 
+# Check whether a stored hash was made with a different work factor than the configured one
+def needs_rehash(hashed_password: str) -> bool:
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+# Run a bcrypt call on the worker pool, refusing work once the queue is full
+async def _run_password_op(func, *args):
+    global _pending_password_ops
+    if _pending_password_ops >= PASSWORD_QUEUE_LIMIT:
+        raise PasswordHasherBusy("Too many password operations in progress")
+
+    _pending_password_ops += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_pool, func, *args)
+    finally:
+        _pending_password_ops -= 1
+
+# Hash password without blocking the event loop
+async def hash_password_async(password: str) -> str:
+    return await _run_password_op(hash_password, password)
+
+# Verify password without blocking the event loop
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_op(verify_password, plain_password, hashed_password)
+
 # Create JWT token
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)):
     to_encode = data.copy()
@@ -28,11 +82,20 @@ def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-# Decode JWT token
+# Decode JWT token, skipping signature verification for tokens verified before
 def verify_access_token(token: str) -> Union[dict, None]:
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    payload = _verified_tokens.get(key)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
 
+    if "exp" in payload:
+        remaining = payload["exp"] - time.time()
+        _verified_tokens.set(key, payload, expires_at=time.monotonic() + remaining)
+    return payload
+
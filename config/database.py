@@ -1,6 +1,104 @@
-from pymongo import MongoClient
+from typing import Dict, Optional
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from config.metrics import MONGO_POOL_MAX, mongo_command_metrics, mongo_pool_metrics
+from config.settings import MongoSettings, ReadRoute, load_mongo_settings
 
-# MongoDB connection
-MONGO_URL = "mongodb://localhost:27017"
-client = MongoClient(MONGO_URL)
-db = client.edushare
+# MongoDB connection settings (config/settings.py); overridable so benchmarks and scripts can point at a scratch database
+settings = load_mongo_settings()
+MONGO_URL = settings.url
+DB_NAME = settings.db
+
+READ_PREFERENCES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# Utility: Client keyword arguments for the pool, timeouts, compression and metrics listeners
+def client_options(settings: MongoSettings) -> dict:
+    options = {
+        "maxPoolSize": settings.max_pool_size,
+        "minPoolSize": settings.min_pool_size,
+        "waitQueueTimeoutMS": settings.wait_queue_timeout_ms,
+        "serverSelectionTimeoutMS": settings.server_selection_timeout_ms,
+        "connectTimeoutMS": settings.connect_timeout_ms,
+        "event_listeners": [mongo_command_metrics, mongo_pool_metrics],
+    }
+    if settings.max_idle_time_ms is not None:
+        options["maxIdleTimeMS"] = settings.max_idle_time_ms
+    if settings.compressors:
+        options["compressors"] = ",".join(settings.compressors)
+    return options
+
+# Utility: `with_options` arguments for one configured read route
+def route_options(route: ReadRoute) -> dict:
+    preference = READ_PREFERENCES.get(route.read_preference)
+    options = {"read_preference": preference(max_staleness=route.max_staleness_seconds) if preference else Primary()}
+    if route.read_concern:
+        options["read_concern"] = ReadConcern(route.read_concern)
+    return options
+
+# Stand-in for the async database, bound by the app lifespan (open_client/close_client) rather than at import,
+# so modules can keep `from config.database import db` while the client only exists while the app is serving
+class DatabaseProxy:
+    def __init__(self):
+        self._database: Optional[AsyncDatabase] = None
+        self._routes: Dict[str, AsyncDatabase] = {}
+
+    def bind(self, database: Optional[AsyncDatabase]):
+        self._database = database
+        self._routes.clear()
+
+    def _target(self) -> AsyncDatabase:
+        if self._database is None:
+            raise RuntimeError("MongoDB client is not open; it is opened by the app lifespan or config.database.open_client()")
+        return self._database
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+    def __getitem__(self, name):
+        return self._target()[name]
+
+    # Database handle carrying the read preference/concern configured for an endpoint (the primary otherwise)
+    def for_route(self, name: str) -> AsyncDatabase:
+        database = self._routes.get(name)
+        if database is None:
+            route = settings.read_routes.get(name)
+            database = self._target() if route is None else self._target().with_options(**route_options(route))
+            self._routes[name] = database
+        return database
+
+# Async client used by the routers, so queries never block the event loop
+client: Optional[AsyncMongoClient] = None
+db = DatabaseProxy()
+
+# Utility: Create the async client and bind `db` to it; the driver connects lazily on the first operation
+def open_client(mongo_settings: Optional[MongoSettings] = None) -> AsyncMongoClient:
+    global client
+    mongo_settings = mongo_settings or settings
+    client = AsyncMongoClient(mongo_settings.url, **client_options(mongo_settings))
+    db.bind(client[mongo_settings.db])
+    MONGO_POOL_MAX.set(mongo_settings.max_pool_size)
+    return client
+
+# Utility: Unbind `db` and close the async client and its pool
+async def close_client():
+    global client
+    if client is not None:
+        db.bind(None)
+        await client.close()
+        client = None
+
+# Sync fallback for scripts and CLI tools that run outside the event loop
+_sync_client = None
+
+def get_sync_db():
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = MongoClient(MONGO_URL, **client_options(settings))
+    return _sync_client[DB_NAME]
@@ -0,0 +1,223 @@
+import time
+from typing import Dict, List, Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+from pymongo import monitoring
+from starlette.routing import compile_path
+
+# Prometheus metrics for HTTP routes, MongoDB commands, bcrypt and the in-process caches, served on GET /metrics.
+# Hot paths cache their labelled children, so recording a sample is a dict lookup plus an observe().
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUESTS = Counter("edushare_http_requests_total", "HTTP requests handled", ["method", "route", "status"])
+HTTP_LATENCY = Histogram(
+    "edushare_http_request_duration_seconds", "HTTP request latency", ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge("edushare_http_requests_in_flight", "HTTP requests currently being handled", ["method", "route"])
+
+MONGO_LATENCY = Histogram(
+    "edushare_mongo_command_duration_seconds", "MongoDB command latency", ["collection", "command"], buckets=LATENCY_BUCKETS,
+)
+MONGO_FAILURES = Counter("edushare_mongo_command_failures_total", "Failed MongoDB commands", ["collection", "command"])
+MONGO_DOCUMENTS = Counter(
+    "edushare_mongo_documents_total", "Documents returned or written by MongoDB commands", ["collection", "command"],
+)
+
+PASSWORD_SECONDS = Histogram(
+    "edushare_password_hash_duration_seconds", "bcrypt time per operation", ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0),
+)
+PASSWORD_PENDING = Gauge("edushare_password_operations_pending", "bcrypt operations queued or running")
+
+# Utility: Prometheus text exposition of every registered metric
+def render_metrics() -> Tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+# ASGI middleware: request count, latency and in-flight gauge per (method, route template)
+class MetricsMiddleware:
+    def __init__(self, app, skip_paths: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = skip_paths
+        self._routes: List[tuple] = []
+        self._children: Dict[tuple, tuple] = {}
+        self._statuses: Dict[tuple, Counter] = {}
+
+    # Route templates come from the OpenAPI schema, which lists every included route with its full path in
+    # registration order; labelling by template keeps the series count bounded no matter which IDs are requested
+    def _route_template(self, scope) -> str:
+        if not self._routes:
+            paths = scope["app"].openapi()["paths"]
+            self._routes = [(compile_path(path)[0], path, {method.upper() for method in operations}) for path, operations in paths.items()]
+        method, path = scope["method"], scope["path"]
+        for regex, template, methods in self._routes:
+            if method in methods and regex.match(path):
+                return template
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        key = (scope["method"], self._route_template(scope))
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (HTTP_LATENCY.labels(*key), HTTP_IN_FLIGHT.labels(*key))
+        latency, in_flight = children
+
+        status = 500
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            latency.observe(time.perf_counter() - started)
+            in_flight.dec()
+            status_key = (*key, status)
+            counter = self._statuses.get(status_key)
+            if counter is None:
+                counter = self._statuses[status_key] = HTTP_REQUESTS.labels(*key, str(status))
+            counter.inc()
+
+# Utility: Number of documents a command returned or wrote, read from its reply
+def _reply_documents(reply) -> int:
+    cursor = reply.get("cursor")
+    if cursor is not None:
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or ())
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
+
+# Command listener: latency, failures and document counts per (collection, command).
+# Passed to every client in config/database.py.
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self._collections: Dict[tuple, str] = {}
+        self._children: Dict[tuple, tuple] = {}
+
+    def _labelled(self, key: tuple) -> tuple:
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (MONGO_LATENCY.labels(*key), MONGO_DOCUMENTS.labels(*key))
+        return children
+
+    def started(self, event):
+        command = event.command
+        collection = command.get("collection") if event.command_name == "getMore" else command.get(event.command_name)
+        self._collections[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else ""
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        latency, documents = self._labelled((collection, event.command_name))
+        latency.observe(event.duration_micros / 1_000_000)
+        documents.inc(_reply_documents(event.reply))
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        MONGO_FAILURES.labels(collection, event.command_name).inc()
+        self._labelled((collection, event.command_name))[0].observe(event.duration_micros / 1_000_000)
+
+mongo_command_metrics = MongoCommandMetrics()
+
+MONGO_POOL_MAX = Gauge("edushare_mongo_pool_max_connections", "Configured maxPoolSize of the async client")
+MONGO_POOL_OPEN = Gauge("edushare_mongo_pool_connections", "Connections open per server", ["address"])
+MONGO_POOL_CHECKED_OUT = Gauge("edushare_mongo_pool_checked_out", "Connections in use per server", ["address"])
+MONGO_POOL_WAITING = Gauge("edushare_mongo_pool_wait_queue", "Operations waiting for a connection per server", ["address"])
+MONGO_POOL_WAIT_SECONDS = Histogram(
+    "edushare_mongo_pool_wait_duration_seconds", "Time spent checking out a connection", ["address"], buckets=LATENCY_BUCKETS,
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "edushare_mongo_pool_checkout_failures_total", "Connection checkouts that failed", ["address", "reason"],
+)
+
+# Pool listener: open, in-use and waiting connections per server, plus checkout wait time. Checked out close to
+# maxPoolSize with a growing wait queue means requests are queueing on the pool rather than on the database.
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self._children: Dict[tuple, tuple] = {}
+
+    def _labelled(self, address) -> tuple:
+        children = self._children.get(address)
+        if children is None:
+            label = "%s:%s" % address
+            children = self._children[address] = (
+                MONGO_POOL_OPEN.labels(label), MONGO_POOL_CHECKED_OUT.labels(label),
+                MONGO_POOL_WAITING.labels(label), MONGO_POOL_WAIT_SECONDS.labels(label),
+            )
+        return children
+
+    def pool_created(self, event):
+        self._labelled(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._labelled(event.address)[0].inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._labelled(event.address)[0].dec()
+
+    def connection_check_out_started(self, event):
+        self._labelled(event.address)[2].inc()
+
+    def connection_checked_out(self, event):
+        _, checked_out, waiting, wait_seconds = self._labelled(event.address)
+        waiting.dec()
+        checked_out.inc()
+        wait_seconds.observe(event.duration)
+
+    def connection_check_out_failed(self, event):
+        _, _, waiting, wait_seconds = self._labelled(event.address)
+        waiting.dec()
+        wait_seconds.observe(event.duration)
+        MONGO_POOL_CHECKOUT_FAILURES.labels("%s:%s" % event.address, event.reason).inc()
+
+    def connection_checked_in(self, event):
+        self._labelled(event.address)[1].dec()
+
+mongo_pool_metrics = MongoPoolMetrics()
+
+COALESCED_REQUESTS = Counter(
+    "edushare_coalesced_requests_total", "Reads that joined an identical in-flight computation", ["endpoint"],
+)
+
+# Collector: hits, misses, size and hit ratio of every registered TTLCache, read at scrape time
+class CacheCollector:
+    def __init__(self):
+        self.caches = {}
+
+    def collect(self):
+        hits = CounterMetricFamily("edushare_cache_hits", "Cache lookups that found a live entry", labels=["cache"])
+        misses = CounterMetricFamily("edushare_cache_misses", "Cache lookups that found nothing usable", labels=["cache"])
+        size = GaugeMetricFamily("edushare_cache_entries", "Entries currently held", labels=["cache"])
+        ratio = GaugeMetricFamily("edushare_cache_hit_ratio", "Hits over lookups since start", labels=["cache"])
+        for name, cache in self.caches.items():
+            lookups = cache.hits + cache.misses
+            hits.add_metric([name], cache.hits)
+            misses.add_metric([name], cache.misses)
+            size.add_metric([name], len(cache))
+            ratio.add_metric([name], cache.hits / lookups if lookups else 0.0)
+        yield from (hits, misses, size, ratio)
+
+_cache_collector = CacheCollector()
+REGISTRY.register(_cache_collector)
+
+# Utility: Export a TTLCache's counters under `name`
+def register_cache(name: str, cache):
+    _cache_collector.caches[name] = cache
@@ -0,0 +1,150 @@
+import argparse
+from collections import defaultdict
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from config.indexes import ensure_indexes_sync
+from utils.tags import rebuild_tag_stats
+
+# One-off data migrations, run with the sync client: python -m config.migrations <name>
+
+# Migration: Move embedded `voters` arrays into the `votes` collection (safe to re-run)
+def migrate_voter_arrays(database) -> int:
+    moved = 0
+    for collection, target_type in (("answers", "answer"), ("users", "user")):
+        for doc in database[collection].find({"voters": {"$exists": True}}, {"voters": 1}):
+            target_id = str(doc["_id"])
+            operations = [
+                UpdateOne(
+                    {"voterId": voter_id, "targetType": target_type, "targetId": target_id},
+                    {"$setOnInsert": {"createdAt": datetime.now()}},
+                    upsert=True,
+                )
+                for voter_id in set(doc["voters"])
+            ]
+            if operations:
+                database.votes.bulk_write(operations, ordered=False)
+                moved += len(operations)
+            database[collection].update_one({"_id": doc["_id"]}, {"$unset": {"voters": ""}})
+    return moved
+
+# Migration: Recount answers' `upvotes` and users' `reputation` from the `votes` collection (safe to re-run).
+# A vote is recorded and counted with two writes, so a crash between them leaves a counter off by one.
+def recount_votes(database, batch_size: int = 1000) -> int:
+    counts = defaultdict(dict)
+    for row in database.votes.aggregate([{"$group": {"_id": {"type": "$targetType", "id": "$targetId"}, "count": {"$sum": 1}}}]):
+        counts[row["_id"]["type"]][row["_id"]["id"]] = row["count"]
+
+    repaired = 0
+    for collection, target_type, field in (("answers", "answer", "upvotes"), ("users", "user", "reputation")):
+        operations, threads = [], set()
+        for doc in database[collection].find({}, {field: 1, "questionId": 1}):
+            count = counts[target_type].get(str(doc["_id"]), 0)
+            if doc.get(field) == count:
+                continue
+            update = {"$set": {field: count}}
+            if collection == "answers":
+                # The upvote count is shown on the answer's thread, so both versions move
+                update["$inc"] = {"version": 1}
+                threads.add(doc.get("questionId"))
+            operations.append(UpdateOne({"_id": doc["_id"]}, update))
+            if len(operations) == batch_size:
+                repaired += database[collection].bulk_write(operations, ordered=False).modified_count
+                operations = []
+        if operations:
+            repaired += database[collection].bulk_write(operations, ordered=False).modified_count
+        thread_ids = [ObjectId(question_id) for question_id in threads if question_id and ObjectId.is_valid(question_id)]
+        if thread_ids:
+            database.questions.update_many({"_id": {"$in": thread_ids}}, {"$inc": {"version": 1}})
+    return repaired
+
+# Migration: Detect questions and answers whose stored `authorName` is missing or stale and repair them
+def repair_author_names(database) -> int:
+    repaired = 0
+    for collection in ("questions", "answers"):
+        # Distinct (author, stored name) pairs, so the users lookup is one small $in per collection
+        names_seen = defaultdict(set)
+        pairs = database[collection].aggregate([{"$group": {"_id": {"authorId": "$authorId", "authorName": "$authorName"}}}])
+        for pair in pairs:
+            names_seen[pair["_id"].get("authorId")].add(pair["_id"].get("authorName"))
+
+        author_ids = [ObjectId(author_id) for author_id in names_seen if ObjectId.is_valid(author_id)]
+        usernames = {str(user["_id"]): user["username"] for user in database.users.find({"_id": {"$in": author_ids}}, {"username": 1})}
+
+        for author_id, seen in names_seen.items():
+            username = usernames.get(author_id)
+            if username is None or seen == {username}:
+                continue
+            stale = {"authorId": author_id, "authorName": {"$ne": username}}
+            # Repaired answers change what their threads show, so those question versions move too
+            thread_ids = database.answers.distinct("questionId", stale) if collection == "answers" else []
+            result = database[collection].update_many(stale, {"$set": {"authorName": username}, "$inc": {"version": 1}})
+            repaired += result.modified_count
+            if thread_ids:
+                database.questions.update_many(
+                    {"_id": {"$in": [ObjectId(question_id) for question_id in thread_ids if ObjectId.is_valid(question_id)]}},
+                    {"$inc": {"version": 1}},
+                )
+    return repaired
+
+# Migration: Set every question's `answerCount` from its answers, bumping the threads whose count changes (safe to re-run)
+def backfill_answer_counts(database, batch_size: int = 1000) -> int:
+    counts = {row["_id"]: row["count"] for row in database.answers.aggregate([{"$group": {"_id": "$questionId", "count": {"$sum": 1}}}])}
+    updated = 0
+    operations = []
+    for question in database.questions.find({}, {"_id": 1}):
+        count = counts.get(str(question["_id"]), 0)
+        operations.append(UpdateOne(
+            {"_id": question["_id"], "answerCount": {"$ne": count}},
+            {"$set": {"answerCount": count}, "$inc": {"version": 1}},
+        ))
+        if len(operations) == batch_size:
+            updated += database.questions.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += database.questions.bulk_write(operations, ordered=False).modified_count
+    return updated
+
+# Migration: Replace users' `questions`/`answers` ID arrays with counters computed from the collections (safe to re-run)
+def backfill_user_counts(database, batch_size: int = 1000) -> int:
+    counts = {
+        field: {row["_id"]: row["count"] for row in database[collection].aggregate([{"$group": {"_id": "$authorId", "count": {"$sum": 1}}}])}
+        for collection, field in (("questions", "questionCount"), ("answers", "answerCount"))
+    }
+    updated = 0
+    operations = []
+    for user in database.users.find({}, {"_id": 1}):
+        user_id = str(user["_id"])
+        operations.append(UpdateOne(
+            {"_id": user["_id"]},
+            {
+                "$set": {field: by_author.get(user_id, 0) for field, by_author in counts.items()},
+                "$unset": {"questions": "", "answers": ""},
+            },
+        ))
+        if len(operations) == batch_size:
+            updated += database.users.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += database.users.bulk_write(operations, ordered=False).modified_count
+    return updated
+
+MIGRATIONS = {
+    "voters": migrate_voter_arrays,
+    "votes": recount_votes,
+    "tags": rebuild_tag_stats,
+    "authors": repair_author_names,
+    "answer_counts": backfill_answer_counts,
+    "user_counts": backfill_user_counts,
+}
+
+if __name__ == "__main__":
+    from config.database import get_sync_db
+
+    parser = argparse.ArgumentParser(description="Run a data migration")
+    parser.add_argument("name", choices=sorted(MIGRATIONS))
+    args = parser.parse_args()
+
+    database = get_sync_db()
+    ensure_indexes_sync(database)
+    print(f"{args.name}: {MIGRATIONS[args.name](database)}")
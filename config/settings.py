@@ -0,0 +1,49 @@
+import json
+import os
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel
+
+# MongoDB connection settings. Defaults are overlaid first by the JSON file named in EDUSHARE_SETTINGS
+# (its "mongo" object), then by MONGO_* environment variables, e.g.
+#   {"mongo": {"max_pool_size": 20, "read_routes": {"fetch_all_questions": {"read_preference": "secondaryPreferred"}}}}
+#   MONGO_MAX_POOL_SIZE=20 MONGO_COMPRESSORS=zstd,zlib MONGO_READ_ROUTES='{"search_questions": {...}}'
+
+SETTINGS_FILE_ENV = "EDUSHARE_SETTINGS"
+
+# Read preference and read concern for one endpoint, keyed by its handler name in MongoSettings.read_routes
+class ReadRoute(BaseModel):
+    read_preference: Literal["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"] = "primary"
+    max_staleness_seconds: int = -1  # -1 means no staleness bound; otherwise at least 90 per the driver
+    read_concern: Optional[Literal["local", "available", "majority", "linearizable", "snapshot"]] = None
+
+class MongoSettings(BaseModel):
+    url: str = "mongodb://localhost:27017"
+    db: str = "edushare"
+    max_pool_size: int = 100  # Per client, so per worker process
+    min_pool_size: int = 0
+    max_idle_time_ms: Optional[int] = None
+    wait_queue_timeout_ms: Optional[int] = 5000  # How long a request may wait for a free connection
+    server_selection_timeout_ms: int = 5000
+    connect_timeout_ms: int = 5000
+    compressors: List[str] = []  # "zlib" works out of the box; "zstd"/"snappy" need their extra packages
+    read_routes: Dict[str, ReadRoute] = {}
+
+# Utility: Build the settings from defaults, the optional settings file and the environment
+def load_mongo_settings() -> MongoSettings:
+    values = {}
+    path = os.getenv(SETTINGS_FILE_ENV)
+    if path:
+        with open(path) as f:
+            values.update(json.load(f).get("mongo", {}))
+
+    for field in MongoSettings.model_fields:
+        raw = os.getenv(f"MONGO_{field.upper()}")
+        if raw is None:
+            continue
+        if field == "compressors":
+            values[field] = [name.strip() for name in raw.split(",") if name.strip()]
+        elif field == "read_routes":
+            values[field] = json.loads(raw)
+        else:
+            values[field] = raw
+    return MongoSettings(**values)
@@ -3,12 +3,32 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from contextlib import asynccontextmanager
+from pymongo.errors import WaitQueueTimeoutError
 
 from router import *
 from config import *
+from config.database import close_client, db, open_client
+from config.indexes import ensure_indexes
+from config.auth import PasswordHasherBusy
+from config.metrics import MetricsMiddleware, render_metrics
+from utils.cascade import resume_cascade_jobs
+
+# Open the MongoDB client, create the registered indexes and pick up interrupted background jobs before serving
+# traffic; the client and its pool are closed on shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    open_client()
+    try:
+        await ensure_indexes(db)
+        await resume_cascade_jobs()
+        yield
+    finally:
+        await close_client()
 
 # Initialize FastAPI app and handle Middleware
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -16,8 +36,26 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+# Shed load instead of queueing unbounded bcrypt work
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request, exc: PasswordHasherBusy):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+# Same for a saturated connection pool: the request waited wait_queue_timeout_ms without getting a connection
+@app.exception_handler(WaitQueueTimeoutError)
+async def mongo_pool_busy_handler(request, exc: WaitQueueTimeoutError):
+    return JSONResponse(status_code=503, content={"detail": "Database connection pool is saturated"}, headers={"Retry-After": "1"})
+
+# Prometheus scrape endpoint; kept out of the API schema and of its own request metrics
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 # Include routers from each service module
 app.include_router(user_router, prefix="/user", tags=["User"])
 app.include_router(question_router, prefix="/question", tags=["Question"])
 app.include_router(answer_router, prefix="/answer", tags=["Answer"])
+app.include_router(job_router, prefix="/jobs", tags=["Job"])
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from typing import Optional
 from datetime import datetime
 
 class UserCreate(BaseModel):
@@ -13,8 +13,8 @@ class UserProfile(BaseModel):
     reputation: int
     joinDate: datetime
     bio: str
-    questions: List[str]  # Use string instead of ObjectId
-    answers: List[str]  # Use string instead of ObjectId
+    questionCount: int = 0  # Activity itself is paged by GET /user/{id}/activity
+    answerCount: int = 0
 
     class Config:
         from_attributes = True
@@ -1,128 +1,206 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Body, HTTPException, Request
 from bson import ObjectId
 from datetime import datetime
 from models.AnswerModel import AnswerCreate, AnswerDetail, AnswerUpdate
 from config.database import db
-from typing import List
+from pymongo import ReturnDocument
+from pymongo.errors import WaitQueueTimeoutError
+from typing import List, Optional
+from utils.pagination import PageLimit, keyset_filter, keyset_sort, build_page
+from utils.streaming import wants_ndjson, ndjson_response
+from utils.serialization import JSONBytesResponse, dumps, id_projection
+from utils.etag import bump_question_versions, question_etag, etag_matches, not_modified, with_etag
+from utils.authors import attach_author_names, fetch_author_name
+from utils.validation import validate_user, validate_question
+from utils.votes import record_vote, remove_vote, raise_vote_rejected
+from utils.coalesce import Coalescer
+from router.QuestionService import forget_question_reads
+from utils.cascade import deletable
+from utils.counters import counter_update
+from utils.batch import check_batch_size, find_existing, insert_batch, increment_counts, push_references, lookup_by_ids, batch_response
 
 answer_router = APIRouter()
 
-# Utility: Validate user existence
-def validate_user(user_id: str):
-    if not db.users.find_one({"_id": ObjectId(user_id)}):
-        raise HTTPException(status_code=400, detail=f"User with ID {user_id} does not exist")
+# Legacy fields kept out of every response (voters now live in the `votes` collection)
+HIDDEN_ANSWER_FIELDS = {"voters": 0, "version": 0}
 
-# Utility: Validate question existence
-def validate_question(question_id: str):
-    if not db.questions.find_one({"_id": ObjectId(question_id)}):
-        raise HTTPException(status_code=404, detail=f"Question with ID {question_id} does not exist")
+# Fields of an answer in list responses, with `_id` already converted to `id` by the projection
+ANSWER_LIST_FIELDS = id_projection("content", "questionId", "authorId", "authorName", "createdAt", "upvotes", "isBestAnswer")
 
-# Utility: Add answer to user's answers list
-def add_answer_to_user(user_id: str, answer_id: str):
-    result = db.users.update_one(
+# Hot reads share identical in-flight queries and a micro-TTL result cache (utils/coalesce.py)
+_answer_pages = Coalescer("fetch_answers_by_question")
+_answer_by_id = Coalescer("fetch_answer_by_id")
+_all_answers = Coalescer("fetch_all_answers", maxsize=1)
+
+# Utility: Drop this process's cached copy of an answer, and the cached full export, after a write changed them
+def forget_answer_reads(answer_id: Optional[str] = None):
+    if answer_id is not None:
+        _answer_by_id.forget(answer_id)
+    _all_answers.forget()
+
+# Utility: Count a new answer on its author's profile
+async def add_answer_to_user(user_id: str, answer_id: str):
+    result = await db.users.update_one(
         {"_id": ObjectId(user_id)},
-        {"$push": {"answers": answer_id}}
+        counter_update({"answerCount": 1})
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=500, detail="Failed to update user's answers")
 
-# Utility: Add answer to question's answers list
-def add_answer_to_question(question_id: str, answer_id: str):
-    result = db.questions.update_one(
+# Utility: Add answer to question's answers list, counting it and bumping the thread version
+async def add_answer_to_question(question_id: str, answer_id: str):
+    result = await db.questions.update_one(
         {"_id": ObjectId(question_id)},
-        {"$push": {"answers": answer_id}}
+        counter_update({"answerCount": 1}, inc={"version": 1}, push={"answers": [answer_id]})
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=500, detail="Failed to update question's answers")
+    forget_question_reads([question_id])
 
-# Utility: Remove answer ID from user's answers list
-def remove_answer_from_user(user_id: str, answer_id: str):
-    result = db.users.update_one(
+# Utility: Uncount a deleted answer on its author's profile
+async def remove_answer_from_user(user_id: str, answer_id: str):
+    result = await db.users.update_one(
         {"_id": ObjectId(user_id)},
-        {"$pull": {"answers": answer_id}}
+        counter_update({"answerCount": -1})
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=500, detail="Failed to remove answer from user's answers list")
 
-# Utility: Remove answer ID from question's answers list
-def remove_answer_from_question(question_id: str, answer_id: str):
-    result = db.questions.update_one(
+# Utility: Remove answer ID from question's answers list, uncounting it and bumping the thread version
+async def remove_answer_from_question(question_id: str, answer_id: str):
+    result = await db.questions.update_one(
         {"_id": ObjectId(question_id)},
-        {"$pull": {"answers": answer_id}}
+        counter_update({"answerCount": -1}, inc={"version": 1}, pull={"answers": [answer_id]})
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=500, detail="Failed to remove answer from question's answers list")
+    forget_question_reads([question_id])
 
 # Create an answer
 @answer_router.post("/answers", response_model=AnswerDetail)
 async def create_answer(answer: AnswerCreate):
-    # Validate user and question existence
-    validate_user(answer.authorId)
-    validate_question(answer.questionId)
+    # Validate user and question existence, keeping the author's name for the answer document
+    author_name = await fetch_author_name(answer.authorId)
+    await validate_question(answer.questionId)
 
     answer_data = answer.dict()
+    answer_data["authorName"] = author_name
     answer_data["createdAt"] = datetime.now()
     answer_data["upvotes"] = 0
     answer_data["isBestAnswer"] = False
+    answer_data["version"] = 1
 
     # Insert answer into the database
-    result = db.answers.insert_one(answer_data)
+    result = await db.answers.insert_one(answer_data)
     answer_id = str(result.inserted_id)
 
     # Add answer ID to user's answers list
-    add_answer_to_user(answer.authorId, answer_id)
+    await add_answer_to_user(answer.authorId, answer_id)
 
     # Add answer ID to question's answers list
-    add_answer_to_question(answer.questionId, answer_id)
+    await add_answer_to_question(answer.questionId, answer_id)
+    forget_answer_reads()
 
     answer_data["id"] = answer_id  # Add the answer ID to the response
     return answer_data
 
-# Fetch answers by question ID
-@answer_router.get("/answers/question/{question_id}", response_model=List[dict])
-async def fetch_answers_by_question(question_id: str):
-    validate_question(question_id)
-    
-    # Find answers for the given question
-    answers = db.answers.find({"questionId": question_id})
-    answer_list = []
-
-    for answer in answers:
-        # Add answer ID as string and remove internal _id
-        answer["id"] = str(answer["_id"])
-        del answer["_id"]
-        
-        # Fetch the author details from the users collection
-        author = db.users.find_one({"_id": ObjectId(answer["authorId"])})
-        if author:
-            # Add author's name to the answer
-            answer["authorName"] = author.get("username", "Unknown")
-
-        # Append the answer with the author name
-        answer_list.append(answer)
-
-    # If no answers are found, raise HTTPException
-    # if not answer_list:
-    #     raise HTTPException(status_code=404, detail="No answers found for this question")
-    
-    return answer_list
+# Create many answers at once: one $in lookup each for authors and questions, one insert_many,
+# then grouped back-reference updates (which also count the answers and bump each touched thread's version once)
+@answer_router.post("/answers/batch", response_model=dict)
+async def create_answers_batch(answers: List[AnswerCreate]):
+    check_batch_size(answers)
+    authors = await find_existing(db.users, (answer.authorId for answer in answers), {"username": 1})
+    questions = await find_existing(db.questions, (answer.questionId for answer in answers), {"_id": 1})
+
+    results = [{"index": index} for index in range(len(answers))]
+    documents, positions = [], []
+    now = datetime.now()
+    for index, answer in enumerate(answers):
+        if answer.authorId not in authors:
+            results[index]["error"] = f"User with ID {answer.authorId} does not exist"
+            continue
+        if answer.questionId not in questions:
+            results[index]["error"] = f"Question with ID {answer.questionId} does not exist"
+            continue
+        answer_data = answer.dict()
+        answer_data["authorName"] = authors[answer.authorId]["username"]
+        answer_data["createdAt"] = now
+        answer_data["upvotes"] = 0
+        answer_data["isBestAnswer"] = False
+        answer_data["version"] = 1
+        documents.append(answer_data)
+        positions.append(index)
+
+    errors = await insert_batch(db.answers, documents)
+    inserted = []
+    for position, (index, answer_data) in enumerate(zip(positions, documents)):
+        if position in errors:
+            results[index]["error"] = errors[position]
+        else:
+            results[index]["id"] = str(answer_data["_id"])
+            inserted.append(answer_data)
+
+    await increment_counts(db.users, "answerCount", (doc["authorId"] for doc in inserted))
+    await push_references(
+        db.questions, "answers", ((doc["questionId"], str(doc["_id"])) for doc in inserted),
+        inc={"version": 1}, count_field="answerCount",
+    )
+    forget_question_reads({doc["questionId"] for doc in inserted})
+    forget_answer_reads()
+    return batch_response(results)
+
+# Fetch answers by question ID, oldest first, one page at a time
+@answer_router.get("/answers/question/{question_id}", response_model=dict)
+async def fetch_answers_by_question(question_id: str, request: Request, limit: int = PageLimit, cursor: Optional[str] = None):
+    # A poll whose thread version is unchanged is answered from one version-only lookup. The version and the
+    # answers are separate reads, so routing this endpoint to secondaries makes its ETag eventually consistent.
+    database = db.for_route("fetch_answers_by_question")
+    etag = await question_etag(question_id, database)
+    if etag and etag_matches(request, etag):
+        return not_modified(etag)
+
+    async def load() -> bytes:
+        # Find answers for the given question
+        query = {"questionId": question_id, **keyset_filter(cursor, descending=False)}
+        answers = database.answers.find(query, ANSWER_LIST_FIELDS).sort(keyset_sort(descending=False)).limit(limit + 1)
+        answer_list = await answers.to_list(None)
+
+        # Answers only exist for existing questions, so the question needs checking only when the page is empty
+        if not answer_list:
+            await validate_question(question_id)
+
+        # Author names are stored on the answers; only legacy documents still need resolving
+        await attach_author_names(answer_list)
+        return dumps(build_page(answer_list, limit))
+
+    # Keyed by the thread's current ETag, so the micro-TTL never hides a write to the thread
+    body = await _answer_pages.run((question_id, etag, limit, cursor), load)
+    return with_etag(JSONBytesResponse(body), etag)
+
+# Resolve many answer IDs in one $in query instead of one GET per ID; order is kept and unknown IDs are marked
+@answer_router.post("/answers/lookup", response_model=dict)
+async def lookup_answers(ids: List[str] = Body(...)):
+    return JSONBytesResponse(await lookup_by_ids(db.for_route("lookup_answers").answers, ids, ANSWER_LIST_FIELDS))
 
 # Fetch answer by answer ID
 @answer_router.get("/answers/{answer_id}", response_model=AnswerDetail)
 async def fetch_answer_by_id(answer_id: str):
-    answer = db.answers.find_one({"_id": ObjectId(answer_id)})
-    if not answer:
-        raise HTTPException(status_code=404, detail="Answer not found")
+    async def load() -> dict:
+        answer = await db.answers.find_one({"_id": ObjectId(answer_id)}, HIDDEN_ANSWER_FIELDS)
+        if not answer:
+            raise HTTPException(status_code=404, detail="Answer not found")
 
-    answer["id"] = str(answer["_id"])
-    del answer["_id"]
-    return answer
+        answer["id"] = str(answer["_id"])
+        del answer["_id"]
+        return answer
+
+    return await _answer_by_id.run(answer_id, load)
 
 # Update an answer
 @answer_router.put("/answers/{answer_id}", response_model=AnswerDetail)
 async def update_answer(answer_id: str, updated_answer: AnswerUpdate):
     # Retrieve the existing answer from the database
-    answer = db.answers.find_one({"_id": ObjectId(answer_id)})
+    answer = await db.answers.find_one({"_id": ObjectId(answer_id)})
     if not answer:
         raise HTTPException(status_code=404, detail="Answer not found")
     # Validate that the user and question exist before updating
@@ -131,14 +209,17 @@ async def update_answer(answer_id: str, updated_answer: AnswerUpdate):
     updated_data = updated_answer.dict(exclude_unset=True)
 
     # Update the answer in the database
-    result = db.answers.find_one_and_update(
+    result = await db.answers.find_one_and_update(
         {"_id": ObjectId(answer_id)},
-        {"$set": updated_data},
+        {"$set": updated_data, "$inc": {"version": 1}},
+        projection=HIDDEN_ANSWER_FIELDS,
         return_document=True
     )
 
     if not result:
         raise HTTPException(status_code=404, detail="Answer not found")
+    await bump_question_versions([result["questionId"]])
+    forget_answer_reads(answer_id)
 
     # Convert ObjectId to string and return the updated answer
     result["id"] = str(result["_id"])
@@ -150,65 +231,72 @@ async def update_answer(answer_id: str, updated_answer: AnswerUpdate):
 async def delete_answer(answer_id: str):
     try:
         # Find the answer
-        answer = db.answers.find_one({"_id": ObjectId(answer_id)})
+        answer = await db.answers.find_one({"_id": ObjectId(answer_id)})
         if not answer:
             raise HTTPException(status_code=404, detail="Answer not found")
 
         # Find the user and validate
-        validate_user(answer["authorId"])
+        await validate_user(answer["authorId"])
 
         # Find the question and validate
-        validate_question(answer["questionId"])
+        await validate_question(answer["questionId"])
 
         # Delete the answer
-        result = db.answers.delete_one({"_id": ObjectId(answer_id)})
+        # Answers claimed by a running cascade are left to it, so their counters are only decremented once
+        result = await db.answers.delete_one({"_id": ObjectId(answer_id), **deletable()})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Answer not found")
 
+        # Cascade delete: Drop the votes cast on the answer
+        await db.votes.delete_many({"targetType": "answer", "targetId": answer_id})
+
         # Cascade delete: Remove the answer from the user's list
-        remove_answer_from_user(answer["authorId"], answer_id)
+        await remove_answer_from_user(answer["authorId"], answer_id)
 
         # Cascade delete: Remove the answer from the question's list
-        remove_answer_from_question(answer["questionId"], answer_id)
+        await remove_answer_from_question(answer["questionId"], answer_id)
+        forget_answer_reads(answer_id)
 
         return {"message": "Answer deleted successfully", "answer_id": answer_id}
+    except WaitQueueTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# Utility: Format an answer returned by a vote update
+def format_voted_answer(answer: dict) -> dict:
+    answer["_id"] = str(answer["_id"])
+    answer["questionId"] = str(answer["questionId"])
+    answer["authorId"] = str(answer["authorId"])
+    return answer
+
 @answer_router.put("/{user_id}/upvote/answer/{answer_id}", response_model=dict)
 async def upvote_answer(user_id: str, answer_id: str):
     try:
         # Validate the user
-        user = db.users.find_one({"_id": ObjectId(user_id)})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # Fetch the answer
-        answer = db.answers.find_one({"_id": ObjectId(answer_id)})
-        if not answer:
-            raise HTTPException(status_code=404, detail="Answer not found")
-
-        # Check if the user has already upvoted
-        if user_id in answer.get("voters", []):
-            raise HTTPException(status_code=400, detail="You have already upvoted this answer")
-
-        # Increment the upvote count and add the user to the voters list
-        updated_upvotes = answer.get("upvotes", 0) + 1
-        db.answers.update_one(
-            {"_id": ObjectId(answer_id)},
-            {"$set": {"upvotes": updated_upvotes}, "$push": {"voters": user_id}}
+        await validate_user(user_id)
+        answer_oid = ObjectId(answer_id)  # Reject malformed IDs before recording anything
+
+        # The unique (voter, target) index rejects a second vote by the same user
+        if not await record_vote(user_id, "answer", answer_id):
+            await raise_vote_rejected(db.answers, answer_id, "Answer not found", "You have already upvoted this answer")
+
+        # Increment the maintained counter
+        updated_answer = await db.answers.find_one_and_update(
+            {"_id": answer_oid},
+            {"$inc": {"upvotes": 1, "version": 1}},
+            projection=HIDDEN_ANSWER_FIELDS,
+            return_document=ReturnDocument.AFTER,
         )
-
-        # Fetch the updated answer
-        updated_answer = db.answers.find_one({"_id": ObjectId(answer_id)})
         if not updated_answer:
-            raise HTTPException(status_code=404, detail="Answer not found after update")
+            await remove_vote(user_id, "answer", answer_id)
+            raise HTTPException(status_code=404, detail="Answer not found")
+        await bump_question_versions([updated_answer["questionId"]])
+        forget_answer_reads(answer_id)
 
-        # Format the response
-        updated_answer["_id"] = str(updated_answer["_id"])
-        updated_answer["questionId"] = str(updated_answer["questionId"])
-        updated_answer["authorId"] = str(updated_answer["authorId"])
-        return updated_answer  # Return the updated answer data
+        return format_voted_answer(updated_answer)  # Return the updated answer data
+    except WaitQueueTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error upvoting the answer: {str(e)}")
 
@@ -217,57 +305,49 @@ async def upvote_answer(user_id: str, answer_id: str):
 async def revoke_upvote_answer(user_id: str, answer_id: str):
     try:
         # Validate the user
-        user = db.users.find_one({"_id": ObjectId(user_id)})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        await validate_user(user_id)
 
-        # Fetch the answer
-        answer = db.answers.find_one({"_id": ObjectId(answer_id)})
-        if not answer:
-            raise HTTPException(status_code=404, detail="Answer not found")
+        # Only a recorded vote can be revoked
+        if not await remove_vote(user_id, "answer", answer_id):
+            await raise_vote_rejected(db.answers, answer_id, "Answer not found", "You have not upvoted this answer")
 
-        # Check if the user has previously upvoted
-        if user_id not in answer.get("voters", []):
-            raise HTTPException(status_code=400, detail="You have not upvoted this answer")
-
-        # Decrement the upvote count and remove the user from the voters list
-        updated_upvotes = max(0, answer.get("upvotes", 0) - 1)  # Ensure upvotes don't go below 0
-        db.answers.update_one(
+        # Decrement the maintained counter
+        updated_answer = await db.answers.find_one_and_update(
             {"_id": ObjectId(answer_id)},
-            {"$set": {"upvotes": updated_upvotes}, "$pull": {"voters": user_id}}
+            {"$inc": {"upvotes": -1, "version": 1}},
+            projection=HIDDEN_ANSWER_FIELDS,
+            return_document=ReturnDocument.AFTER,
         )
-
-        # Fetch the updated answer
-        updated_answer = db.answers.find_one({"_id": ObjectId(answer_id)})
         if not updated_answer:
-            raise HTTPException(status_code=404, detail="Answer not found after update")
+            raise HTTPException(status_code=404, detail="Answer not found")
+        await bump_question_versions([updated_answer["questionId"]])
+        forget_answer_reads(answer_id)
 
-        # Format the response
-        updated_answer["_id"] = str(updated_answer["_id"])
-        updated_answer["questionId"] = str(updated_answer["questionId"])
-        updated_answer["authorId"] = str(updated_answer["authorId"])
-        return updated_answer  # Return updated answer data
+        return format_voted_answer(updated_answer)  # Return updated answer data
+    except WaitQueueTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error revoking upvote on the answer: {str(e)}")
 
+# AnswerDetail fields only, matching what the response_model used to filter the export down to
+ANSWER_DETAIL_FIELDS = id_projection("content", "questionId", "authorId", "createdAt", "upvotes", "isBestAnswer")
+
+# Fetch all answers; send `Accept: application/x-ndjson` to stream them instead of buffering the list
 @answer_router.get("/answers", response_model=List[AnswerDetail])
-async def fetch_all_answers():
-    # try:
-    # Fetch all answers from the database
-    answers_cursor = db.answers.find()
-    answers_list = []
+async def fetch_all_answers(request: Request):
+    answers = db.for_route("fetch_all_answers").answers
+    if wants_ndjson(request):
+        return ndjson_response(answers.find({}, ANSWER_DETAIL_FIELDS))
 
-    for answer in answers_cursor:
-        answer["id"] = str(answer["_id"])
-        answer["questionId"] = str(answer["questionId"])
-        answer["authorId"] = str(answer["authorId"])
-        del answer["_id"]  # Remove the ObjectId key
-        answers_list.append(answer)
+    # try:
+    # Fetch all answers from the database, already in the AnswerDetail shape; concurrent exports share one read
+    async def load() -> bytes:
+        answers_list = await answers.find({}, ANSWER_DETAIL_FIELDS).to_list(None)
 
-    # if not answers_list:
-    #     raise HTTPException(status_code=404, detail="No answers found")
+        # if not answers_list:
+        #     raise HTTPException(status_code=404, detail="No answers found")
+        return dumps(answers_list)
 
-    return answers_list
+    return JSONBytesResponse(await _all_answers.run("all", load))
     # except Exception as e:
     #     raise HTTPException(status_code=400, detail=f"Error fetching all answers: {str(e)}")
-
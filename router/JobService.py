@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException
+from bson import ObjectId
+from config.database import db
+from utils.cascade import format_job
+
+job_router = APIRouter()
+
+# Fetch the status and progress of a background job
+@job_router.get("/{job_id}", response_model=dict)
+async def get_job(job_id: str):
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+
+    job = await db.jobs.find_one({"_id": ObjectId(job_id)})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return format_job(job)
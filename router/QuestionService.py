@@ -1,168 +1,286 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Body, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from bson import ObjectId
 from datetime import datetime
-from typing import List
+from collections import Counter
+from typing import Iterable, List, Literal, Optional
+import re
 from models.QuestionModel import QuestionCreate, QuestionDetail, QuestionUpdate
 from config.database import db
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PageLimit, keyset_filter, keyset_sort, build_page
+from utils.authors import attach_author_names, fetch_author_name
+from utils.search import search_pipeline
+from utils.serialization import JSONBytesResponse, dumps, excerpt, id_projection
+from utils.etag import question_etag, thread_etag, etag_matches, not_modified, with_etag
+from utils.tags import apply_tag_counts, update_tag_stats
+from utils.batch import check_batch_size, find_existing, insert_batch, increment_counts, lookup_by_ids, batch_response
+from utils.validation import validate_user
+from utils.coalesce import Coalescer
+from utils.counters import count_expression, counter_update
+from utils.cascade import (
+    CASCADE_INLINE_LIMIT, cascade_delete_question, question_cascade_size,
+    create_cascade_job, run_cascade_job, format_job, claim_for_deletion, find_active_job,
+)
 import pymongo
+from pymongo.errors import WaitQueueTimeoutError
 question_router = APIRouter()
 
-# Utility: Validate user existence
-def validate_user(user_id: str):
-    if not db.users.find_one({"_id": ObjectId(user_id)}):
-        raise HTTPException(status_code=400, detail=f"User with ID {user_id} does not exist")
-
-# Utility: Add question ID to user's questions
-def add_question_to_user(user_id: str, question_id: str):
-    result = db.users.update_one(
+# Fields of a question in list responses, with `_id` already converted to `id` by the projection
+QUESTION_LIST_FIELDS = id_projection("title", "content", "tags", "createdAt", "authorId", "authorName", "answers")
+
+# Lean list shape for `view=summary`: an excerpt instead of the body and the maintained answer counter instead of
+# the ID array (derived from the array only for documents no answer has been added to or removed from since)
+QUESTION_SUMMARY_FIELDS = {
+    **id_projection("title", "tags", "createdAt", "authorId", "authorName"),
+    "excerpt": excerpt("content"),
+    "answerCount": count_expression("answerCount"),
+}
+QUESTION_VIEWS = {"full": QUESTION_LIST_FIELDS, "summary": QUESTION_SUMMARY_FIELDS}
+
+# Hot reads share identical in-flight queries and a micro-TTL result cache (utils/coalesce.py)
+_questions_by_user = Coalescer("fetch_questions_by_user")
+_question_by_id = Coalescer("fetch_question_by_id")
+_question_pages = Coalescer("fetch_all_questions")
+_searches = Coalescer("search_questions")
+_tag_lists = Coalescer("fetch_tags")
+_tag_pages = Coalescer("fetch_tag")
+_question_details = Coalescer("fetch_question_with_answers")
+
+# Utility: Drop this process's cached copies of the given questions and every cached question list page, after
+# a write changed them; the thread endpoints need none of this since they are keyed by the thread ETag
+def forget_question_reads(question_ids: Iterable[str] = ()):
+    for question_id in question_ids:
+        _question_by_id.forget(question_id)
+    _questions_by_user.forget()
+    _question_pages.forget()
+
+# Utility: Count a new question on its author's profile
+async def add_question_to_user(user_id: str, question_id: str):
+    result = await db.users.update_one(
         {"_id": ObjectId(user_id)},
-        {"$push": {"questions": question_id}}
+        counter_update({"questionCount": 1})
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=500, detail="Failed to update user's questions")
 
-# Utility: Remove question ID from user's questions list
-def remove_question_from_user(user_id: str, question_id: str):
-    result = db.users.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$pull": {"questions": question_id}}
-    )
-    if result.modified_count == 0:
-        raise HTTPException(status_code=500, detail="Failed to remove question from user's questions list")
-
-
-# Utility: Remove answer ID from user's answers list
-def remove_answer_from_user(user_id: str, answer_id: str):
-    result = db.users.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$pull": {"answers": answer_id}}  # Remove the answer from the user's list by its string ID
-    )
-    if result.modified_count == 0:
-        raise HTTPException(status_code=500, detail="Failed to remove answer from user's answers list")
-
-# Utility: Remove answer ID from question's answers list
-def remove_answer_from_question(question_id: str, answer_id: str):
-    result = db.questions.update_one(
-        {"_id": ObjectId(question_id)},
-        {"$pull": {"answers": answer_id}}  # Remove the answer from the question's list by its string ID
-    )
-    if result.modified_count == 0:
-        raise HTTPException(status_code=500, detail="Failed to remove answer from question's answers list")
 # Create a question
 @question_router.post("/questions", response_model=QuestionDetail)
 async def create_question(question: QuestionCreate):
-    validate_user(question.authorId)
+    author_name = await fetch_author_name(question.authorId)
 
     question_data = question.dict()
+    question_data["authorName"] = author_name
     question_data["createdAt"] = datetime.now()
     question_data["answers"] = []
+    question_data["answerCount"] = 0
+    question_data["version"] = 1
 
     # Insert into questions collection
-    result = db.questions.insert_one(question_data)
+    result = await db.questions.insert_one(question_data)
     question_id = str(result.inserted_id)
 
     # Add question ID to user's questions
-    add_question_to_user(question.authorId, question_id)
+    await add_question_to_user(question.authorId, question_id)
+    await update_tag_stats(question_data["tags"], [])
+    forget_question_reads()
 
     question_data["id"] = question_id
     return question_data
 
-# Fetch questions by user ID
-@question_router.get("/questions/user/{user_id}", response_model=List[QuestionDetail])
-async def fetch_questions_by_user(user_id: str):
-    validate_user(user_id)
-    questions = db.questions.find({"authorId": user_id})
-    question_list = []
-
-    for question in questions:
-        question["id"] = str(question["_id"])
-        question["answers"] = [str(answer) for answer in question["answers"]]
-        del question["_id"]
-        question_list.append(question)
-
-    # if not question_list:
-    #     raise HTTPException(status_code=404, detail="No questions found for this user")
-    return question_list
+# Create many questions at once: one $in author lookup, one insert_many and grouped back-reference updates
+@question_router.post("/questions/batch", response_model=dict)
+async def create_questions_batch(questions: List[QuestionCreate]):
+    check_batch_size(questions)
+    authors = await find_existing(db.users, (question.authorId for question in questions), {"username": 1})
+
+    results = [{"index": index} for index in range(len(questions))]
+    documents, positions = [], []
+    now = datetime.now()
+    for index, question in enumerate(questions):
+        if question.authorId not in authors:
+            results[index]["error"] = f"User with ID {question.authorId} does not exist"
+            continue
+        question_data = question.dict()
+        question_data["authorName"] = authors[question.authorId]["username"]
+        question_data["createdAt"] = now
+        question_data["answers"] = []
+        question_data["answerCount"] = 0
+        question_data["version"] = 1
+        documents.append(question_data)
+        positions.append(index)
+
+    errors = await insert_batch(db.questions, documents)
+    inserted = []
+    for position, (index, question_data) in enumerate(zip(positions, documents)):
+        if position in errors:
+            results[index]["error"] = errors[position]
+        else:
+            results[index]["id"] = str(question_data["_id"])
+            inserted.append(question_data)
+
+    await increment_counts(db.users, "questionCount", (doc["authorId"] for doc in inserted))
+    await apply_tag_counts(Counter(tag for doc in inserted for tag in set(doc["tags"])))
+    forget_question_reads()
+    return batch_response(results)
+
+# Fetch questions by user ID, newest first, one page at a time
+@question_router.get("/questions/user/{user_id}", response_model=dict)
+async def fetch_questions_by_user(
+    user_id: str,
+    limit: int = PageLimit,
+    cursor: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
+):
+    async def load() -> bytes:
+        await validate_user(user_id)
+        query = {"authorId": user_id, **keyset_filter(cursor)}
+        questions = db.for_route("fetch_questions_by_user").questions.find(query, QUESTION_VIEWS[view]).sort(keyset_sort()).limit(limit + 1)
+        question_list = await questions.to_list(None)
+
+        # if not question_list:
+        #     raise HTTPException(status_code=404, detail="No questions found for this user")
+        return dumps(build_page(question_list, limit))
+
+    return JSONBytesResponse(await _questions_by_user.run((user_id, limit, cursor, view), load))
+
+# Resolve many question IDs in one $in query instead of one GET per ID; order is kept and unknown IDs are marked
+@question_router.post("/questions/lookup", response_model=dict)
+async def lookup_questions(ids: List[str] = Body(...), view: Literal["full", "summary"] = "full"):
+    return JSONBytesResponse(await lookup_by_ids(db.for_route("lookup_questions").questions, ids, QUESTION_VIEWS[view]))
 
 # Fetch question by question ID
 @question_router.get("/questions/{question_id}", response_model=QuestionDetail)
 async def fetch_question_by_id(question_id: str):
-    question = db.questions.find_one({"_id": ObjectId(question_id)})
-    if not question:
-        raise HTTPException(status_code=404, detail="Question not found")
+    async def load() -> dict:
+        question = await db.questions.find_one({"_id": ObjectId(question_id)})
+        if not question:
+            raise HTTPException(status_code=404, detail="Question not found")
+
+        await validate_user(question["authorId"])
 
-    validate_user(question["authorId"])
+        question["id"] = str(question["_id"])
+        question["answers"] = [str(answer) for answer in question["answers"]]
+        del question["_id"]
+        return question
 
-    question["id"] = str(question["_id"])
-    question["answers"] = [str(answer) for answer in question["answers"]]
-    del question["_id"]
-    return question
+    return await _question_by_id.run(question_id, load)
     # raise HTTPException(status_code=400, detail="Invalid question ID format")
 
 
 
-@question_router.get("/questions", response_model=List[dict])
-async def fetch_all_questions():
-    # Aggregation pipeline to join questions with the users collection to get author details
-    pipeline = [
-        {
-            "$addFields": {
-                "authorId": {"$toObjectId": "$authorId"}  # Convert authorId from string to ObjectId
-            }
-        },
-        {
-            "$lookup": {
-                "from": "users",  # The users collection
-                "localField": "authorId",  # The field in the questions collection that links to users
-                "foreignField": "_id",  # The field in the users collection that links to questions
-                "as": "author"  # The resulting field that will contain the user data
-            }
-        },
-        {
-            "$unwind": "$author"  # Flatten the array created by $lookup
-        },
-        {
-            "$project": {
-                "_id": 0,  # Exclude the internal MongoDB _id from the response
-                "id": {"$toString": "$_id"},  # Convert ObjectId to string for the question ID
-                "title": 1,
-                "content": 1,
-                "tags": 1,
-                "createdAt": 1,
-                "authorId": {"$toString": "$authorId"},
-                "authorName": "$author.username",  # Get the author's username
-                "answers": 1
-            }
-        }
-    ]
+# Utility: One keyset page of questions, newest first, optionally narrowed to a tag or an author
+async def fetch_question_page(
+    limit: int,
+    cursor: Optional[str],
+    tag: Optional[str] = None,
+    author_id: Optional[str] = None,
+    route: str = "fetch_all_questions",
+    view: Literal["full", "summary"] = "full",
+) -> dict:
+    match = keyset_filter(cursor)
+    if tag:
+        match["tags"] = tag
+    if author_id:
+        match["authorId"] = author_id
 
     try:
-        # Execute the aggregation pipeline
-        questions = db.questions.aggregate(pipeline)
-        question_list = []
-
-        for question in questions:
-            # Ensure the answers are converted to strings
-            question["answers"] = [str(answer) for answer in question["answers"]]  # Convert ObjectId to str
-            question_list.append(question)
-
-        if not question_list:
-            raise HTTPException(status_code=404, detail="No questions found")
+        questions = db.for_route(route).questions.find(match, QUESTION_VIEWS[view]).sort(keyset_sort()).limit(limit + 1)
+        question_list = await questions.to_list(None)
 
-        return question_list
+        # Author names are stored on the questions; only legacy documents still need resolving
+        await attach_author_names(question_list)
+        return build_page(question_list, limit)
 
+    except WaitQueueTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
+@question_router.get("/questions", response_model=dict)
+async def fetch_all_questions(
+    limit: int = PageLimit,
+    cursor: Optional[str] = None,
+    tag: Optional[str] = None,
+    authorId: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
+):
+    async def load() -> bytes:
+        return dumps(await fetch_question_page(limit, cursor, tag, authorId, view=view))
+
+    return JSONBytesResponse(await _question_pages.run((limit, cursor, tag, authorId, view), load))
+
+# Full-text search over title, content and tags, ranked by relevance, with tag facets
+@question_router.get("/search", response_model=dict)
+async def search_questions(
+    q: str = Query(..., min_length=1, max_length=200),
+    tag: Optional[str] = None,
+    limit: int = PageLimit,
+    skip: int = Query(0, ge=0, le=1000),
+):
+    async def load() -> bytes:
+        results = await db.for_route("search_questions").questions.aggregate(search_pipeline(q, tag, skip, limit))
+        facets = await results.next()
+
+        items = facets["items"]
+        has_more = len(items) > limit
+        items = items[:limit]
+        await attach_author_names(items)
+
+        return dumps({
+            "items": items,
+            "tags": facets["tags"],
+            "total": facets["total"][0]["count"] if facets["total"] else 0,
+            "next_skip": skip + limit if has_more else None,
+        })
+
+    return JSONBytesResponse(await _searches.run((q, tag, limit, skip), load))
+
+# Utility: Convert a `tags` document into its public shape
+def format_tag(tag: dict) -> dict:
+    return {"tag": tag["_id"], "count": tag["count"], "lastActivity": tag.get("lastActivity")}
+
+# Most used tags, or tags starting with `prefix` for autocomplete, served from the `tags` collection
+@question_router.get("/tags", response_model=dict)
+async def fetch_tags(
+    prefix: Optional[str] = Query(None, max_length=100),
+    limit: int = PageLimit,
+):
+    async def load() -> bytes:
+        tag_stats = db.for_route("fetch_tags").tags
+        if prefix:
+            # An anchored, escaped regex is a range scan on the _id index
+            tags = tag_stats.find({"_id": {"$regex": f"^{re.escape(prefix)}"}}).sort("_id", 1)
+        else:
+            tags = tag_stats.find().sort([("count", -1), ("_id", 1)])
+
+        return dumps({"items": [format_tag(tag) async for tag in tags.limit(limit)]})
+
+    return JSONBytesResponse(await _tag_lists.run((prefix, limit), load))
+
+# Statistics of one tag plus a page of its questions, newest first
+@question_router.get("/tags/{tag}", response_model=dict)
+async def fetch_tag(tag: str, limit: int = PageLimit, cursor: Optional[str] = None):
+    async def load() -> bytes:
+        stats = await db.for_route("fetch_tag").tags.find_one({"_id": tag})
+        if not stats:
+            raise HTTPException(status_code=404, detail="Tag not found")
+
+        # Served by the tags_createdAt_id index
+        page = await fetch_question_page(limit, cursor, tag=tag, route="fetch_tag")
+        return dumps({**format_tag(stats), **page})
+
+    return JSONBytesResponse(await _tag_pages.run((tag, limit, cursor), load))
+
 @question_router.put("/questions/{question_id}", response_model=QuestionDetail)
 async def update_question(question_id: str, updated_data: QuestionUpdate):
     # Validate the question ID
-    question = db.questions.find_one({"_id": ObjectId(question_id)})
+    question = await db.questions.find_one({"_id": ObjectId(question_id)})
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
 
     # Validate the user ID (author of the question)
-    validate_user(question["authorId"])
+    await validate_user(question["authorId"])
 
     # Prepare the update data
     update_fields = {key: value for key, value in updated_data.dict().items() if value is not None}
@@ -170,17 +288,26 @@ async def update_question(question_id: str, updated_data: QuestionUpdate):
     # Prevent updating `id` and `authorId`
     if "id" in update_fields in update_fields:
         raise HTTPException(status_code=400, detail="Cannot update `id` fields")
+    # `authorId` identifies the editor; the stored author and its denormalized `authorName` never change here
+    if update_fields.pop("authorId") != question["authorId"]:
+        raise HTTPException(status_code=403, detail="Only the author can update this question")
 
     # Update the question in MongoDB
-    result = db.questions.find_one_and_update(
+    result = await db.questions.find_one_and_update(
         {"_id": ObjectId(question_id)},
-        {"$set": update_fields},
+        {"$set": update_fields, "$inc": {"version": 1}},
         return_document=pymongo.ReturnDocument.AFTER
     )
 
     if not result:
         raise HTTPException(status_code=500, detail="Failed to update the question")
 
+    # Keep the tag statistics in step with the tags that were actually added or removed
+    if "tags" in update_fields:
+        old_tags, new_tags = set(question.get("tags") or []), set(result["tags"])
+        await update_tag_stats(new_tags - old_tags, old_tags - new_tags)
+    forget_question_reads([question_id])
+
     # Convert ObjectId and answers for response
     result["id"] = str(result["_id"])
     result["answers"] = [str(answer) for answer in result["answers"]]
@@ -190,95 +317,133 @@ async def update_question(question_id: str, updated_data: QuestionUpdate):
 
 
 @question_router.delete("/questions/{question_id}", response_model=dict)
-async def delete_question(question_id: str):
+async def delete_question(question_id: str, background_tasks: BackgroundTasks):
     try:
         # Find the question
-        question = db.questions.find_one({"_id": ObjectId(question_id)})
+        question = await db.questions.find_one({"_id": ObjectId(question_id)}, {"authorId": 1, "tags": 1})
         if not question:
             raise HTTPException(status_code=404, detail="Question not found")
 
-        # Validate user existence
-        validate_user(question["authorId"])
+        # A delete arriving while a job is still working on the question gets that job back
+        job = await find_active_job("delete_question", question_id)
+        if job:
+            return JSONResponse(status_code=202, content=jsonable_encoder(format_job(job)))
 
-        # Find all answers associated with the question
-        answers = db.answers.find({"questionId": question_id})
+        # Claim the question first so concurrent deletes cannot both run the cascade
+        owner = ObjectId()
+        if not await claim_for_deletion(db.questions, {"_id": question["_id"]}, owner):
+            raise HTTPException(status_code=409, detail="Question is already being deleted")
 
-        # Delete each answer associated with the question
-        for answer in answers:
-            answer_id = str(answer["_id"])
+        # Large threads are deleted by a background job so the request returns quickly
+        total = await question_cascade_size(question_id)
+        if total > CASCADE_INLINE_LIMIT:
+            job, created = await create_cascade_job("delete_question", question_id, total, owner)
+            if created:
+                background_tasks.add_task(run_cascade_job, job["_id"])
+            return JSONResponse(status_code=202, content=jsonable_encoder(format_job(job)))
 
-            # Remove the answer from the user's list of answers
-            remove_answer_from_user(answer["authorId"], answer_id)
-
-            # Remove the answer from the question's list of answers
-            remove_answer_from_question(question_id, answer_id)
-
-            # Delete the answer from the answers collection
-            db.answers.delete_one({"_id": ObjectId(answer_id)})
-
-        # Remove the question from the user's question list
-        remove_question_from_user(question["authorId"], question_id)
-
-        # Delete the question from the questions collection
-        result = db.questions.delete_one({"_id": ObjectId(question_id)})
-        if result.deleted_count == 0:
-            raise HTTPException(status_code=404, detail="Failed to delete the question")
+        # Delete the answers, their references and votes with bulk writes, then the question itself
+        await cascade_delete_question(question)
+        forget_question_reads([question_id])
 
         return {"message": "Question and associated answers deleted successfully", "question_id": question_id}
     
+    except HTTPException:
+        raise
+    except WaitQueueTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# Orderings available for the answers of a question detail page
+ANSWER_SORTS = {
+    "oldest": {"createdAt": 1, "_id": 1},
+    "upvotes": {"upvotes": -1, "createdAt": 1, "_id": 1},
+    "best": {"isBestAnswer": -1, "upvotes": -1, "createdAt": 1, "_id": 1},
+}
+
 @question_router.get("/questions/details/{question_id}", response_model=dict)
-async def fetch_question_with_answers(question_id: str):
-    try:
-        # Fetch the question document
-        question = db.questions.find_one({"_id": ObjectId(question_id)})
-        if not question:
+async def fetch_question_with_answers(
+    question_id: str,
+    request: Request,
+    sort: Literal["oldest", "upvotes", "best"] = "oldest",
+    answers_limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    answers_skip: int = Query(0, ge=0),
+):
+    # A poll whose thread version is unchanged is answered from one version-only lookup
+    database = db.for_route("fetch_question_with_answers")
+    etag = await question_etag(question_id, database)
+    if etag and etag_matches(request, etag):
+        return not_modified(etag)
+
+    async def load() -> tuple:
+        try:
+            # One aggregation fetches the question and one page of its answers; author names are stored on both
+            pipeline = [
+                {"$match": {"_id": ObjectId(question_id)}},
+                {
+                    "$addFields": {
+                        "questionIdString": {"$toString": "$_id"},
+                        "answerCount": count_expression("answerCount"),
+                    }
+                },
+                {
+                    "$lookup": {
+                        "from": "answers",
+                        "localField": "questionIdString",
+                        "foreignField": "questionId",
+                        "pipeline": [
+                            {"$sort": ANSWER_SORTS[sort]},
+                            {"$skip": answers_skip},
+                            {"$limit": answers_limit},
+                            {
+                                "$project": {
+                                    "_id": 0,
+                                    "id": {"$toString": "$_id"},
+                                    "content": 1,
+                                    "questionId": 1,
+                                    "authorId": 1,
+                                    "authorName": 1,
+                                    "createdAt": 1,
+                                    "upvotes": 1,
+                                    "isBestAnswer": 1,
+                                }
+                            },
+                        ],
+                        "as": "answers",
+                    }
+                },
+            ]
+
+            questions = await database.questions.aggregate(pipeline)
+            question = await questions.next()
+        except StopAsyncIteration:
             raise HTTPException(status_code=404, detail="Question not found")
-
-        # Fetch the author's name (question author)
-        author = db.users.find_one({"_id": ObjectId(question["authorId"])}, {"username": 1})
-        if not author:
+        except WaitQueueTimeoutError:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail="An error occurred: " + str(e))
+
+        # Documents written before author names were stored fall back to one batched lookup
+        await attach_author_names([question, *question["answers"]])
+        if not question.get("authorName"):
             raise HTTPException(status_code=404, detail="Author not found")
 
-        # Fetch answers and include their full details
-        answer_ids = question.get("answers", [])
-        answers = list(db.answers.find({"_id": {"$in": [ObjectId(aid) for aid in answer_ids]}}))
-        if not answers:
-            answers = []
-
-        # Format answers with the author's name
-        formatted_answers = []
-        for answer in answers:
-            # Fetch the author's name for each answer
-            answer_author = db.users.find_one({"_id": ObjectId(answer["authorId"])}, {"username": 1})
-            if not answer_author:
-                raise HTTPException(status_code=404, detail="Answer author not found")
-            
-            formatted_answers.append({
-                "id": str(answer["_id"]),
-                "content": answer["content"],
-                "questionId": str(answer["questionId"]),
-                "authorId": str(answer["authorId"]),
-                "authorName": answer_author["username"],  # Answer author's name
-                "createdAt": answer["createdAt"],
-                "upvotes": answer["upvotes"],
-                "isBestAnswer": answer["isBestAnswer"],
-            })
-
-        # Prepare the response
-        response = {
+        # Prepare the response, tagged with the version it was read at
+        next_skip = answers_skip + answers_limit
+        return dumps({
             "questionId": str(question["_id"]),
             "authorId": str(question["authorId"]),
-            "authorName": author["username"],  # Question author's name
+            "authorName": question["authorName"],  # Question author's name
             "title": question["title"],
             "content": question["content"],
             "tags": question["tags"],
             "createdAt": question["createdAt"],
-            "answers": formatted_answers,
-        }
-        return response
-    except Exception as e:
-        raise HTTPException(status_code=400, detail="An error occurred: " + str(e))
-
+            "answerCount": question["answerCount"],
+            "answers": question["answers"],
+            "answers_next_skip": next_skip if next_skip < question["answerCount"] else None,
+        }), thread_etag(question_id, question.get("version", 0))
+
+    # Keyed by the thread's current ETag, so the micro-TTL never hides a write to the thread
+    body, response_etag = await _question_details.run((question_id, etag, sort, answers_limit, answers_skip), load)
+    return with_etag(JSONBytesResponse(body), response_etag)
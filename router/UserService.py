@@ -1,137 +1,328 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, Body, HTTPException, Depends, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, WaitQueueTimeoutError
 from datetime import datetime, timedelta
 from models.UserModel import UserCreate, UserProfile, UserLogin, UserUpdate
 from config.auth import * 
 from config.database import db
-from typing import List
+from typing import List, Optional
+from utils.cache import TTLCache
+from config.metrics import register_cache
+from utils.streaming import wants_ndjson, ndjson_response
+from utils.serialization import JSONBytesResponse, excerpt
+from utils.pagination import PageLimit, keyset_filter, keyset_sort, build_page
+from utils.authors import propagate_author_name
+from utils.validation import validate_user
+from utils.cascade import (
+    CASCADE_INLINE_LIMIT, cascade_delete_user, user_cascade_size,
+    create_cascade_job, run_cascade_job, format_job, claim_for_deletion, find_active_job,
+)
+from utils.votes import record_vote, remove_vote, raise_vote_rejected
+from utils.counters import count_expression
+from utils.batch import check_batch_size, insert_batch, lookup_by_ids, batch_response
+import asyncio
+import os
 
 user_router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/user/login")
 
+# Utility: Convert a raw user document into the public UserProfile shape. Counters are derived from the legacy
+# ID arrays only for users nothing has been counted on since (see utils/counters.py).
+def format_user_profile(user: dict) -> dict:
+    return {
+        "id": str(user["_id"]),  # Convert ObjectId to string
+        "username": user["username"],
+        "email": user["email"],
+        "reputation": user.get("reputation", 0),
+        "joinDate": user.get("joinDate"),
+        "bio": user.get("bio", ""),
+        "questionCount": user.get("questionCount", len(user.get("questions", []))),
+        "answerCount": user.get("answerCount", len(user.get("answers", []))),
+    }
+
+# Fields never sent back to clients
+PRIVATE_USER_FIELDS = {"passwordHash": 0, "password": 0, "voters": 0}
+
+# format_user_profile expressed as a find projection, so list reads need no per-document Python pass
+USER_PROFILE_FIELDS = {
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+    "username": 1,
+    "email": 1,
+    "reputation": {"$ifNull": ["$reputation", 0]},
+    "joinDate": {"$ifNull": ["$joinDate", None]},
+    "bio": {"$ifNull": ["$bio", ""]},
+    "questionCount": count_expression("questionCount"),
+    "answerCount": count_expression("answerCount"),
+}
+
+# Briefly cache the user resolved from a bearer token so authenticated reads skip Mongo (0 disables)
+CURRENT_USER_CACHE_TTL = float(os.getenv("CURRENT_USER_CACHE_TTL", "5"))
+_current_users = TTLCache(maxsize=1000, ttl=CURRENT_USER_CACHE_TTL)
+register_cache("current_users", _current_users)
+
+# Dependency: Resolve the current user from the bearer token
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+    credentials_error = HTTPException(
+        status_code=401,
+        detail="Invalid or expired token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    payload = verify_access_token(token)
+    if not payload or not ObjectId.is_valid(payload.get("sub", "")):
+        raise credentials_error
+
+    user_id = payload["sub"]
+    user = _current_users.get(user_id)
+    if user is None:
+        user = await db.users.find_one({"_id": ObjectId(user_id)}, PRIVATE_USER_FIELDS)
+        if not user:
+            raise credentials_error
+        _current_users.set(user_id, user)
+    return user
+
 # Register a new user
 @user_router.post("/register", response_model=UserProfile)
 async def register(user: UserCreate):
     user_data = user.dict()
-    user_data["passwordHash"] = hash_password(user.password)  # Hash the password
+    del user_data["password"]  # Only the hash is stored
     user_data["reputation"] = 0
     user_data["joinDate"] = datetime.now()
-    user_data["questions"] = []
-    user_data["answers"] = []
+    user_data["questionCount"] = 0
+    user_data["answerCount"] = 0
     user_data["bio"] = ""
 
-    existing_user = db.users.find_one({"email": user_data["email"]})
+    existing_user = await db.users.find_one({"email": user_data["email"]})
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    result = db.users.insert_one(user_data)
+    user_data["passwordHash"] = await hash_password_async(user.password)  # Hash the password on the worker pool
+
+    try:
+        result = await db.users.insert_one(user_data)
+    except DuplicateKeyError:
+        # The unique indexes catch usernames and emails registered concurrently
+        raise HTTPException(status_code=400, detail="Username or email already registered")
     user_data["_id"] = str(result.inserted_id)
 
     return user_data
 
+# Register many users at once: one $in lookup for taken usernames and emails, then one insert_many.
+# Passwords are hashed PASSWORD_WORKERS at a time so a large batch never overflows the hashing queue.
+@user_router.post("/batch", response_model=dict)
+async def register_batch(users: List[UserCreate]):
+    check_batch_size(users)
+    taken = await db.users.find(
+        {"$or": [{"username": {"$in": [user.username for user in users]}}, {"email": {"$in": [user.email for user in users]}}]},
+        {"username": 1, "email": 1},
+    ).to_list(None)
+    taken_usernames = {user["username"] for user in taken}
+    taken_emails = {user["email"] for user in taken}
+
+    results = [{"index": index} for index in range(len(users))]
+    accepted = []
+    for index, user in enumerate(users):
+        if user.username in taken_usernames or user.email in taken_emails:
+            results[index]["error"] = "Username or email already registered"
+            continue
+        # Later duplicates within the same batch are rejected too
+        taken_usernames.add(user.username)
+        taken_emails.add(user.email)
+        accepted.append(index)
+
+    hashes = []
+    for start in range(0, len(accepted), PASSWORD_WORKERS):
+        chunk = accepted[start:start + PASSWORD_WORKERS]
+        hashes += await asyncio.gather(*(hash_password_async(users[index].password) for index in chunk))
+
+    now = datetime.now()
+    documents = []
+    for index, password_hash in zip(accepted, hashes):
+        user_data = users[index].dict()
+        del user_data["password"]  # Only the hash is stored
+        user_data.update({
+            "reputation": 0, "joinDate": now, "questionCount": 0, "answerCount": 0, "bio": "", "passwordHash": password_hash,
+        })
+        documents.append(user_data)
+
+    # The unique indexes still catch usernames and emails registered concurrently
+    errors = await insert_batch(db.users, documents)
+    for position, (index, user_data) in enumerate(zip(accepted, documents)):
+        if position in errors:
+            results[index]["error"] = "Username or email already registered"
+        else:
+            results[index]["id"] = str(user_data["_id"])
+    return batch_response(results)
+
 @user_router.post("/login")
 async def login(user: UserLogin):
-    user_data = db.users.find_one({"username": user.username})
-    if not user_data or not verify_password(user.password, user_data["passwordHash"]):
+    user_data = await db.users.find_one({"username": user.username}, {"passwordHash": 1})
+    if not user_data or not await verify_password_async(user.password, user_data["passwordHash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # Transparently upgrade hashes made with a different work factor
+    if needs_rehash(user_data["passwordHash"]):
+        new_hash = await hash_password_async(user.password)
+        await db.users.update_one({"_id": user_data["_id"]}, {"$set": {"passwordHash": new_hash}})
+
     # Generate JWT token
     access_token_expires = timedelta(hours=1)
     access_token = create_access_token(data={"sub": str(user_data["_id"])}, expires_delta=access_token_expires)
     
     return {"id": str(user_data["_id"]), "access_token": access_token, "token_type": "bearer"}
 
+# Resolve many user IDs to profiles in one $in query instead of one GET per ID; order is kept and unknown IDs are marked
+@user_router.post("/lookup", response_model=dict)
+async def lookup_users(ids: List[str] = Body(...)):
+    return JSONBytesResponse(await lookup_by_ids(db.for_route("lookup_users").users, ids, USER_PROFILE_FIELDS))
+
+# Fetch the profile of the authenticated user
+@user_router.get("/me", response_model=UserProfile)
+async def get_me(current_user: dict = Depends(get_current_user)):
+    return format_user_profile(current_user)
+
 @user_router.get("/{user_id}", response_model=UserProfile)
 async def get_user_by_id(user_id: str):
     try:
-        # Validate and convert user_id to ObjectId
-        user = db.users.find_one({"_id": ObjectId(user_id)})
+        # Validate and convert user_id to ObjectId; the projection already produces the UserProfile shape
+        user = await db.users.find_one({"_id": ObjectId(user_id)}, USER_PROFILE_FIELDS)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-        
-        strQ = [str(q) for q in user.get("questions", [])]
-        strA = [str(a) for a in user.get("answers", [])]
-        
-        # Transform the data to match the UserProfile schema
-        return {
-            "id": str(user["_id"]),  # Convert ObjectId to string
-            "username": user["username"],
-            "email": user["email"],
-            "reputation": user.get("reputation", 0),
-            "joinDate": user.get("joinDate"),
-            "bio": user.get("bio", ""),
-            "questions": strQ,
-            "answers": strA,
-        }
+
+        return user
+    except WaitQueueTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error getting user by ID: {str(e)}")
 
+# Activity feed fields: both collections are projected to one shape, told apart by `type`
+ACTIVITY_FIELDS = {
+    "questions": {"type": {"$literal": "question"}, "title": 1, "excerpt": excerpt("content"), "tags": 1, "createdAt": 1},
+    "answers": {"type": {"$literal": "answer"}, "questionId": 1, "excerpt": excerpt("content"), "upvotes": 1, "createdAt": 1},
+}
+
+# Utility: Newest-first keyset slice of one collection's documents by an author, served by authorId_createdAt_id
+def activity_stages(collection: str, user_id: str, cursor: Optional[str], limit: int) -> list:
+    return [
+        {"$match": {"authorId": user_id, **keyset_filter(cursor)}},
+        {"$sort": keyset_sort()},
+        {"$limit": limit + 1},
+        {"$project": ACTIVITY_FIELDS[collection]},
+    ]
+
+# A user's questions and answers as one time-ordered feed, newest first, one page at a time. Each collection
+# contributes at most limit + 1 documents through its index before the merged sort, so deep histories stay cheap.
+@user_router.get("/{user_id}/activity", response_model=dict)
+async def fetch_user_activity(user_id: str, limit: int = PageLimit, cursor: Optional[str] = None):
+    await validate_user(user_id)
+    pipeline = [
+        *activity_stages("questions", user_id, cursor, limit),
+        {"$unionWith": {"coll": "answers", "pipeline": activity_stages("answers", user_id, cursor, limit)}},
+        {"$sort": keyset_sort()},
+        {"$limit": limit + 1},
+        {"$addFields": {"id": {"$toString": "$_id"}}},
+        {"$project": {"_id": 0}},
+    ]
+    items = await (await db.for_route("fetch_user_activity").questions.aggregate(pipeline)).to_list(None)
+    return JSONBytesResponse(build_page(items, limit))
+
 # Update User Profile
 @user_router.put("/{user_id}", response_model=UserProfile)
-async def update_user(user_id: str, user: UserUpdate):
+async def update_user(user_id: str, user: UserUpdate, background_tasks: BackgroundTasks):
     try:
-        existing_user = db.users.find_one({"_id": ObjectId(user_id)})
+        existing_user = await db.users.find_one({"_id": ObjectId(user_id)})
         if not existing_user:
             raise HTTPException(status_code=404, detail="User not found")
         
         updated_data = user.dict(exclude_unset=True)  # Only update provided fields
         if "password" in updated_data and updated_data["password"] != None:
-            updated_data["passwordHash"] = hash_password(updated_data["password"]) 
+            updated_data["passwordHash"] = await hash_password_async(updated_data["password"])
             del updated_data["password"]
 
-        db.users.update_one({"_id": ObjectId(user_id)}, {"$set": updated_data})
-        updated_user = db.users.find_one({"_id": ObjectId(user_id)})
+        await db.users.update_one({"_id": ObjectId(user_id)}, {"$set": updated_data})
+        _current_users.pop(user_id)
+
+        # Questions and answers carry the author's name, so a rename is copied onto them after the response
+        if updated_data.get("username") not in (None, existing_user.get("username")):
+            background_tasks.add_task(propagate_author_name, user_id)
+        updated_user = await db.users.find_one({"_id": ObjectId(user_id)}, PRIVATE_USER_FIELDS)
         if updated_user is None:
             raise HTTPException(status_code=404, detail="User not found after update")
         
-        updated_user["_id"] = str(updated_user["_id"])
-        return updated_user
+        return format_user_profile(updated_user)
         
+    except (PasswordHasherBusy, WaitQueueTimeoutError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid user ID: {str(e)}")
 
 @user_router.put("/{user_id}/reputation/{target_user_id}", response_model=UserProfile)
 async def increase_reputation(user_id: str, target_user_id: str):
     try:
-        user = db.users.find_one({"_id": ObjectId(user_id)})
-        target_user = db.users.find_one({"_id": ObjectId(target_user_id)})
-        
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        if not target_user:
-            raise HTTPException(status_code=404, detail="Target user not found")
-        if user_id in target_user.get("voters", []):
-            raise HTTPException(status_code=400, detail="You have already increased the reputation of this user")
+        await validate_user(user_id)
+        target_oid = ObjectId(target_user_id)  # Reject malformed IDs before recording anything
 
-        updated_reputation = target_user.get("reputation", 0) + 1  # Increase reputation by 1
-        db.users.update_one(
-            {"_id": ObjectId(target_user_id)}, 
-            {"$set": {"reputation": updated_reputation}, "$push": {"voters": user_id}}  # Add user_id to the voters list
+        # The unique (voter, target) index rejects a second vote by the same user
+        if not await record_vote(user_id, "user", target_user_id):
+            await raise_vote_rejected(db.users, target_user_id, "Target user not found", "You have already increased the reputation of this user")
+
+        # Increase reputation by 1
+        updated_target_user = await db.users.find_one_and_update(
+            {"_id": target_oid},
+            {"$inc": {"reputation": 1}},
+            projection=PRIVATE_USER_FIELDS,
+            return_document=ReturnDocument.AFTER,
         )
-        
-        # Get the updated target user data
-        updated_target_user = db.users.find_one({"_id": ObjectId(target_user_id)})
         if updated_target_user is None:
-            raise HTTPException(status_code=404, detail="Target user not found after update")
+            await remove_vote(user_id, "user", target_user_id)
+            raise HTTPException(status_code=404, detail="Target user not found")
         
-        updated_target_user["_id"] = str(updated_target_user["_id"])
-        return updated_target_user  # Return updated user data with the new reputation
+        return format_user_profile(updated_target_user)  # Return updated user data with the new reputation
         
+    except WaitQueueTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error increasing reputation: {str(e)}")
 
 # Delete User Profile
 @user_router.delete("/{user_id}", response_model=dict)
-async def delete_user(user_id: str):
+async def delete_user(user_id: str, background_tasks: BackgroundTasks):
     try:
         # Validate and convert user_id to ObjectId
-        existing_user = db.users.find_one({"_id": ObjectId(user_id)})
+        existing_user = await db.users.find_one({"_id": ObjectId(user_id)}, {"_id": 1})
         if not existing_user:
             raise HTTPException(status_code=404, detail="User not found")
-        
-        db.users.delete_one({"_id": ObjectId(user_id)})
+        _current_users.pop(user_id)
+
+        # A delete arriving while a job is still working on the user gets that job back
+        job = await find_active_job("delete_user", user_id)
+        if job:
+            return JSONResponse(status_code=202, content=jsonable_encoder(format_job(job)))
+
+        # Claim the user first so concurrent deletes cannot both run the cascade
+        owner = ObjectId()
+        if not await claim_for_deletion(db.users, {"_id": existing_user["_id"]}, owner):
+            raise HTTPException(status_code=409, detail="User is already being deleted")
+
+        # Prolific users are deleted by a background job so the request returns quickly
+        total = await user_cascade_size(user_id)
+        if total > CASCADE_INLINE_LIMIT:
+            job, created = await create_cascade_job("delete_user", user_id, total, owner)
+            if created:
+                background_tasks.add_task(run_cascade_job, job["_id"])
+            return JSONResponse(status_code=202, content=jsonable_encoder(format_job(job)))
+
+        # Delete the user's questions, answers and votes along with the user
+        await cascade_delete_user(user_id)
         return {"detail": "User deleted successfully"}
+    except HTTPException:
+        raise
+    except WaitQueueTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid user ID: {str(e)}")
 
@@ -139,59 +330,41 @@ async def delete_user(user_id: str):
 @user_router.put("/{user_id}/revoke/{target_user_id}", response_model=dict)
 async def revoke_reputation(user_id: str, target_user_id: str):
     try:
-        # Validate users
-        user = db.users.find_one({"_id": ObjectId(user_id)})
-        target_user = db.users.find_one({"_id": ObjectId(target_user_id)})
-
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        if not target_user:
-            raise HTTPException(status_code=404, detail="Target user not found")
+        await validate_user(user_id)
 
-        # Check if the user has previously upvoted
-        if user_id not in target_user.get("voters", []):
-            raise HTTPException(status_code=400, detail="You have not upvoted this user")
+        # Only a recorded vote can be revoked
+        if not await remove_vote(user_id, "user", target_user_id):
+            await raise_vote_rejected(db.users, target_user_id, "Target user not found", "You have not upvoted this user")
 
-        # Decrement the reputation and remove the user from voters
-        updated_reputation = target_user.get("reputation", 0) - 1
-        db.users.update_one(
+        # Decrement the reputation
+        updated_target_user = await db.users.find_one_and_update(
             {"_id": ObjectId(target_user_id)},
-            {"$set": {"reputation": updated_reputation}, "$pull": {"voters": user_id}}
+            {"$inc": {"reputation": -1}},
+            projection=PRIVATE_USER_FIELDS,
+            return_document=ReturnDocument.AFTER,
         )
+        if updated_target_user is None:
+            raise HTTPException(status_code=404, detail="Target user not found")
 
-        # Fetch the updated target user
-        updated_target_user = db.users.find_one({"_id": ObjectId(target_user_id)})
-        if not updated_target_user:
-            raise HTTPException(status_code=404, detail="Target user not found after update")
-
-        updated_target_user["_id"] = str(updated_target_user["_id"])
-        return updated_target_user  # Return updated user data
+        return format_user_profile(updated_target_user)  # Return updated user data
+    except WaitQueueTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error revoking reputation: {str(e)}")
 
+# Fetch all users; send `Accept: application/x-ndjson` to stream them instead of buffering the list
 @user_router.get("/", response_model=List[dict])
-async def get_all_users():
+async def get_all_users(request: Request):
     try:
-        # Fetch all users from the database
-        users_cursor = db.users.find()
-        users = []
-        
-        # Transform the data to match the UserProfile schema
-        for user in users_cursor:
-            strQ = [str(q) for q in user.get("questions", [])]
-            strA = [str(a) for a in user.get("answers", [])]
-            
-            users.append({
-                "id": str(user["_id"]),  # Convert ObjectId to string
-                "username": user["username"],
-                "email": user["email"],
-                "reputation": user.get("reputation", 0),
-                "joinDate": user.get("joinDate"),
-                "bio": user.get("bio", ""),
-                "questions": strQ,
-                "answers": strA,
-            })
+        users = db.for_route("get_all_users").users
+        if wants_ndjson(request):
+            return ndjson_response(users.find({}, USER_PROFILE_FIELDS))
+
+        # Fetch all users from the database, already in the UserProfile shape
+        user_list = await users.find({}, USER_PROFILE_FIELDS).to_list(None)
         
-        return users
+        return JSONBytesResponse(user_list)
+    except WaitQueueTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error getting all users: {str(e)}")
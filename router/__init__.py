@@ -1,3 +1,4 @@
 from .UserService import *
 from .QuestionService import *
 from .AnswerService import *
+from .JobService import *
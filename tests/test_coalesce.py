@@ -0,0 +1,52 @@
+import asyncio
+
+from utils.coalesce import Coalescer
+
+# Utility: A computation returning successive values, counting how often it ran
+def counter():
+    calls = []
+
+    async def compute():
+        calls.append(None)
+        await asyncio.sleep(0)
+        return len(calls)
+
+    return compute, calls
+
+def test_forget_drops_cached_result():
+    async def scenario():
+        reads = Coalescer("test_forget_key", ttl=60)
+        compute, calls = counter()
+        assert await reads.run("a", compute) == 1
+        assert await reads.run("a", compute) == 1
+        reads.forget("a")
+        assert await reads.run("a", compute) == 2
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+def test_forget_without_key_drops_every_result():
+    async def scenario():
+        reads = Coalescer("test_forget_all", ttl=60)
+        compute, _ = counter()
+        await reads.run("a", compute)
+        await reads.run("b", compute)
+        reads.forget()
+        assert len(reads.cache) == 0
+
+    asyncio.run(scenario())
+
+def test_read_started_before_forget_is_not_cached():
+    async def scenario():
+        reads = Coalescer("test_forget_in_flight", ttl=60)
+        compute, calls = counter()
+        started = asyncio.ensure_future(reads.run("a", compute))
+        await asyncio.sleep(0)
+        reads.forget("a")  # A write lands while the read is still running
+
+        # The stale read still answers its own caller, but a later read computes afresh
+        assert await started == 1
+        assert await reads.run("a", compute) == 2
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from pymongo import AsyncMongoClient, monitoring
+from pymongo.errors import WaitQueueTimeoutError
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+import config.database as database
+import main
+import router.AnswerService as answer_service
+import router.UserService as user_service
+from config.metrics import MongoPoolMetrics
+from config.settings import SETTINGS_FILE_ENV, MongoSettings, ReadRoute, load_mongo_settings
+
+# No MongoDB server is needed: the async client connects lazily and `with_options` never touches the network
+
+UNREACHABLE_URL = "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=100"
+SAMPLE_ID = "0123456789abcdef01234567"
+
+@pytest.fixture
+def clean_env(monkeypatch):
+    monkeypatch.delenv(SETTINGS_FILE_ENV, raising=False)
+    for field in MongoSettings.model_fields:
+        monkeypatch.delenv(f"MONGO_{field.upper()}", raising=False)
+    return monkeypatch
+
+@pytest.fixture
+def client(monkeypatch):
+    routes = {"search_questions": ReadRoute(read_preference="secondaryPreferred", read_concern="local")}
+    monkeypatch.setattr(database, "settings", MongoSettings(read_routes=routes))
+    client = AsyncMongoClient(UNREACHABLE_URL)
+    yield client
+    asyncio.run(client.close())
+
+def test_load_mongo_settings_defaults(clean_env):
+    assert load_mongo_settings() == MongoSettings()
+
+def test_load_mongo_settings_file_then_env(clean_env, tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"mongo": {
+        "db": "from_file",
+        "max_pool_size": 20,
+        "read_routes": {"fetch_all_questions": {"read_preference": "nearest"}},
+    }}))
+    clean_env.setenv(SETTINGS_FILE_ENV, str(path))
+    clean_env.setenv("MONGO_MAX_POOL_SIZE", "50")
+    clean_env.setenv("MONGO_COMPRESSORS", "zstd, zlib,")
+    clean_env.setenv("MONGO_READ_ROUTES", json.dumps({"search_questions": {"read_concern": "majority"}}))
+
+    settings = load_mongo_settings()
+    assert settings.db == "from_file"
+    assert settings.max_pool_size == 50
+    assert settings.compressors == ["zstd", "zlib"]
+    assert list(settings.read_routes) == ["search_questions"]
+    assert settings.read_routes["search_questions"].read_concern == "majority"
+
+def test_route_options():
+    options = database.route_options(ReadRoute(read_preference="secondaryPreferred", max_staleness_seconds=90, read_concern="local"))
+    assert options["read_preference"] == SecondaryPreferred(max_staleness=90)
+    assert options["read_concern"] == ReadConcern("local")
+
+    options = database.route_options(ReadRoute())
+    assert options == {"read_preference": Primary()}
+
+def test_for_route_applies_and_caches_options(client):
+    bound = client["edushare_test"]
+    proxy = database.DatabaseProxy()
+    proxy.bind(bound)
+    routed = proxy.for_route("search_questions")
+    assert routed.read_preference == SecondaryPreferred()
+    assert routed.read_concern == ReadConcern("local")
+    assert proxy.for_route("search_questions") is routed
+
+    # Routes without settings read from the bound database itself
+    assert proxy.for_route("fetch_question_by_id") is bound
+
+def test_for_route_rebinding_clears_cache(client):
+    proxy = database.DatabaseProxy()
+    proxy.bind(client["edushare_test"])
+    routed = proxy.for_route("search_questions")
+    proxy.bind(client["edushare_other"])
+    rebound = proxy.for_route("search_questions")
+    assert rebound is not routed
+    assert rebound.name == "edushare_other"
+
+def test_unbound_proxy_raises():
+    proxy = database.DatabaseProxy()
+    with pytest.raises(RuntimeError):
+        proxy.users
+    with pytest.raises(RuntimeError):
+        proxy["users"]
+    with pytest.raises(RuntimeError):
+        proxy.for_route("search_questions")
+
+def test_pool_saturation_returns_503():
+    assert main.app.exception_handlers[WaitQueueTimeoutError] is main.mongo_pool_busy_handler
+
+    app = FastAPI()
+    app.add_exception_handler(WaitQueueTimeoutError, main.mongo_pool_busy_handler)
+
+    @app.get("/saturated")
+    async def saturated():
+        raise WaitQueueTimeoutError("Timed out while checking out a connection from connection pool")
+
+    response = TestClient(app).get("/saturated")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json() == {"detail": "Database connection pool is saturated"}
+
+# Utility: Current value of a per-server pool series
+def pool_sample(name: str, address: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, {"address": address, **labels}) or 0.0
+
+def test_pool_metrics_track_waiting_checked_out_and_failures():
+    metrics = MongoPoolMetrics()
+    address, label = ("pool-test", 27017), "pool-test:27017"
+
+    # Three operations queue for a connection: two get one, the third times out
+    for _ in range(3):
+        metrics.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(address))
+    assert pool_sample("edushare_mongo_pool_wait_queue", label) == 3
+
+    metrics.connection_checked_out(monitoring.ConnectionCheckedOutEvent(address, 1, 0.002))
+    metrics.connection_checked_out(monitoring.ConnectionCheckedOutEvent(address, 2, 0.004))
+    metrics.connection_check_out_failed(
+        monitoring.ConnectionCheckOutFailedEvent(address, monitoring.ConnectionCheckOutFailedReason.TIMEOUT, 5.0)
+    )
+    assert pool_sample("edushare_mongo_pool_wait_queue", label) == 0
+    assert pool_sample("edushare_mongo_pool_checked_out", label) == 2
+    assert pool_sample("edushare_mongo_pool_checkout_failures_total", label, reason="timeout") == 1
+    assert pool_sample("edushare_mongo_pool_wait_duration_seconds_count", label) == 3
+
+    metrics.connection_checked_in(monitoring.ConnectionCheckedInEvent(address, 1))
+    assert pool_sample("edushare_mongo_pool_checked_out", label) == 1
+
+# Stand-in database whose every collection fails the way a saturated pool does
+class SaturatedDatabase:
+    def __getattr__(self, name):
+        raise WaitQueueTimeoutError("Timed out while checking out a connection from connection pool")
+
+async def saturated_pool(*args, **kwargs):
+    raise WaitQueueTimeoutError("Timed out while checking out a connection from connection pool")
+
+def test_handlers_let_pool_saturation_reach_the_503_handler(monkeypatch):
+    monkeypatch.setattr(user_service, "db", SaturatedDatabase())
+    monkeypatch.setattr(answer_service, "validate_user", saturated_pool)
+    client = TestClient(main.app)
+
+    for response in (
+        client.get(f"/user/{SAMPLE_ID}"),
+        client.put(f"/answer/{SAMPLE_ID}/upvote/answer/{SAMPLE_ID}"),
+    ):
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import router.QuestionService as question_service
+
+QUESTION_ID = "0123456789abcdef01234567"
+
+# Stand-in for the question collection: no thread version, and an aggregation that records its pipeline
+class RecordingQuestions:
+    def __init__(self):
+        self.pipelines = []
+
+    async def find_one(self, *args, **kwargs):
+        return None
+
+    async def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return self
+
+    async def next(self):
+        raise StopAsyncIteration
+
+class RecordingDatabase:
+    def __init__(self):
+        self.questions = RecordingQuestions()
+
+    def for_route(self, name):
+        return self
+
+@pytest.fixture
+def questions(monkeypatch):
+    database = RecordingDatabase()
+    monkeypatch.setattr(question_service, "db", database)
+    return database.questions
+
+# Utility: The $limit applied to the answers of the thread-details aggregation
+def answers_limit(pipeline) -> int:
+    lookup = next(stage["$lookup"] for stage in pipeline if "$lookup" in stage)
+    return next(stage["$limit"] for stage in lookup["pipeline"] if "$limit" in stage)
+
+def test_answers_limit_sets_lookup_limit(questions):
+    client = TestClient(main.app)
+    assert client.get(f"/question/questions/details/{QUESTION_ID}?answers_limit=5").status_code == 404
+    assert client.get(f"/question/questions/details/{QUESTION_ID}").status_code == 404
+    assert [answers_limit(pipeline) for pipeline in questions.pipelines] == [5, 20]
+
+def test_answers_limit_is_bounded(questions):
+    client = TestClient(main.app)
+    assert client.get(f"/question/questions/details/{QUESTION_ID}?answers_limit=0").status_code == 422
+    assert client.get(f"/question/questions/details/{QUESTION_ID}?answers_limit=101").status_code == 422
+    assert questions.pipelines == []
+
+def test_answers_limit_documented_under_its_own_name():
+    operation = main.app.openapi()["paths"]["/question/questions/details/{question_id}"]["get"]
+    assert "answers_limit" in {parameter["name"] for parameter in operation["parameters"]}
@@ -0,0 +1,49 @@
+from typing import List
+from bson import ObjectId
+from fastapi import HTTPException
+from config.database import db
+from utils.validation import known_users
+from utils.etag import bump_question_versions
+
+# Questions and answers store their author's `authorName` at write time so list and detail reads need no join.
+# A username change is fanned out in the background, and `python -m config.migrations authors` repairs any drift.
+
+# Utility: Fetch the username to denormalize onto a new document, validating the author on the way
+async def fetch_author_name(user_id: str) -> str:
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, {"username": 1})
+    if not user:
+        raise HTTPException(status_code=400, detail=f"User with ID {user_id} does not exist")
+    known_users.set(user_id, True)
+    return user["username"]
+
+# Utility: Attach `authorName` to documents written before it was denormalized, with a single $in query
+async def attach_author_names(documents: List[dict]) -> List[dict]:
+    missing = [doc for doc in documents if not doc.get("authorName")]
+    author_ids = {str(doc["authorId"]) for doc in missing if doc.get("authorId")}
+    object_ids = [ObjectId(author_id) for author_id in author_ids if ObjectId.is_valid(author_id)]
+    if not object_ids:
+        return documents
+
+    names = {}
+    async for user in db.users.find({"_id": {"$in": object_ids}}, {"username": 1}):
+        names[str(user["_id"])] = user.get("username", "Unknown")
+
+    for doc in missing:
+        author_id = str(doc.get("authorId"))
+        if author_id in names:
+            doc["authorName"] = names[author_id]
+    return documents
+
+# Background task: Copy a user's current username onto every question and answer they wrote.
+# Reads the name at run time, so two quick renames can never leave the older one behind.
+async def propagate_author_name(user_id: str):
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, {"username": 1})
+    if not user:
+        return
+    stale = {"authorId": user_id, "authorName": {"$ne": user["username"]}}
+    # Threads showing a renamed answer author change too, so their versions are bumped along with the names
+    thread_ids = await db.answers.distinct("questionId", stale)
+
+    await db.questions.update_many(stale, {"$set": {"authorName": user["username"]}, "$inc": {"version": 1}})
+    await db.answers.update_many(stale, {"$set": {"authorName": user["username"]}, "$inc": {"version": 1}})
+    await bump_question_versions(thread_ids)
@@ -0,0 +1,94 @@
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from utils.counters import counter_update
+
+# Largest array accepted by the batch write endpoints
+MAX_BATCH_SIZE = 1000
+
+# Utility: Reject oversized batches before touching the database
+def check_batch_limit(items: list):
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch size is limited to {MAX_BATCH_SIZE} items")
+
+# Utility: Reject empty or oversized batches before touching the database
+def check_batch_size(items: list):
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one item")
+    check_batch_limit(items)
+
+# Utility: Map the valid ObjectId strings among `ids` to their documents with a single $in query
+async def find_existing(collection, ids: Iterable[str], projection: dict) -> Dict[str, dict]:
+    object_ids = [ObjectId(doc_id) for doc_id in set(ids) if ObjectId.is_valid(doc_id)]
+    if not object_ids:
+        return {}
+    return {str(doc["_id"]): doc async for doc in collection.find({"_id": {"$in": object_ids}}, projection)}
+
+# Utility: insert_many(ordered=False) that reports failures per document position instead of raising.
+# pymongo assigns `_id` to every document before sending, so the ones without an error are inserted.
+async def insert_batch(collection, documents: List[dict]) -> Dict[int, str]:
+    if not documents:
+        return {}
+    try:
+        await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        return {error["index"]: error.get("errmsg", "Insert failed") for error in e.details["writeErrors"]}
+    return {}
+
+# Utility: Append many IDs to their parent documents, one grouped update per parent; `count_field`, when given,
+# is moved by the number of IDs appended to each parent (see utils/counters.py)
+async def push_references(
+    collection,
+    field: str,
+    pairs: Iterable[Tuple[str, str]],
+    inc: Optional[dict] = None,
+    count_field: Optional[str] = None,
+):
+    grouped = defaultdict(list)
+    for parent_id, child_id in pairs:
+        grouped[parent_id].append(child_id)
+
+    operations = []
+    for parent_id, child_ids in grouped.items():
+        counts = {count_field: len(child_ids)} if count_field else {}
+        update = counter_update(counts, inc=inc, push={field: child_ids})
+        operations.append(UpdateOne({"_id": ObjectId(parent_id)}, update))
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+
+# Utility: Move counter `field` on each parent by the number of times it appears in `parent_ids`, one update per
+# parent (see utils/counters.py)
+async def increment_counts(collection, field: str, parent_ids: Iterable[str]):
+    operations = [
+        UpdateOne({"_id": ObjectId(parent_id)}, counter_update({field: count}))
+        for parent_id, count in Counter(parent_ids).items()
+    ]
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+
+# Utility: Resolve IDs to documents with one $in query. Items keep the input order (duplicates included) and IDs
+# that are unknown or malformed come back as {"id": ..., "missing": true}, also listed under `missing`.
+# `projection` must produce a string `id`, as id_projection does. An empty list resolves to an empty result, since
+# pages that render a profile's questions and answers often have none to look up.
+async def lookup_by_ids(collection, ids: List[str], projection: dict) -> dict:
+    check_batch_limit(ids)
+    keys = [str(ObjectId(doc_id)) if ObjectId.is_valid(doc_id) else None for doc_id in ids]
+    object_ids = [ObjectId(key) for key in set(keys) if key]
+    found = {doc["id"]: doc async for doc in collection.find({"_id": {"$in": object_ids}}, projection)} if object_ids else {}
+
+    items, missing = [], []
+    for doc_id, key in zip(ids, keys):
+        doc = found.get(key)
+        if doc is None:
+            missing.append(doc_id)
+            doc = {"id": doc_id, "missing": True}
+        items.append(doc)
+    return {"items": items, "missing": missing}
+
+# Utility: Response envelope listing one result per input item, in input order
+def batch_response(results: List[dict]) -> dict:
+    failed = sum(1 for result in results if "error" in result)
+    return {"created": len(results) - failed, "failed": failed, "results": results}
@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import os
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from bson import ObjectId
+from pymongo import UpdateOne
+from config.database import db
+from utils.validation import forget_question, forget_user
+from utils.tags import apply_tag_counts
+from utils.etag import bump_question_versions
+from utils.counters import counter_update
+
+logger = logging.getLogger(__name__)
+
+# Cascades deleting more documents (questions and answers) than this run as a background job instead of inside
+# the request
+CASCADE_INLINE_LIMIT = int(os.getenv("CASCADE_INLINE_LIMIT", "500"))
+CASCADE_BATCH_SIZE = 1000
+# How long a claim on a document being deleted, or on a running job, holds without being renewed. A claim left
+# behind by a crashed worker can be taken over once it expires.
+CASCADE_LEASE = timedelta(seconds=int(os.getenv("CASCADE_LEASE_SECONDS", "300")))
+
+# Strong references to resumed jobs so the event loop does not drop them mid-run
+_resumed_jobs = set()
+
+# Every step below is a $pull or a delete_many, and the parent document is deleted last, so an interrupted
+# cascade can simply be run again. Vote counters are decremented only for votes actually deleted, so a
+# rerun never decrements twice.
+# Concurrent cascades never touch the same document: questions, users and answers are claimed with a `deleting`
+# lease before they are deleted, and whoever fails to claim one leaves it to the current holder.
+
+# Utility: Filter matching documents nobody is deleting, or whose deletion lease has expired
+def deletable(owner: Optional[ObjectId] = None) -> dict:
+    conditions = [{"deleting": None}, {"deleting.until": {"$lt": datetime.now()}}]
+    if owner is not None:
+        conditions.append({"deleting.owner": owner})
+    return {"$or": conditions}
+
+# Utility: Claim every document matching `query` for deletion by `owner`; returns how many were claimed
+async def claim_for_deletion(collection, query: dict, owner: ObjectId) -> int:
+    lease = {"owner": owner, "until": datetime.now() + CASCADE_LEASE}
+    result = await collection.update_many({"$and": [query, deletable(owner)]}, {"$set": {"deleting": lease}})
+    return result.modified_count
+
+# Utility: Advance the progress counter of a job and renew its lease (no-op for inline cascades)
+async def _report_progress(job_id: Optional[ObjectId], processed: int):
+    if job_id is not None:
+        await db.jobs.update_one(
+            {"_id": job_id},
+            {"$inc": {"processed": processed}, "$set": {"leaseUntil": datetime.now() + CASCADE_LEASE}},
+        )
+
+# Utility: Delete a batch of answers with their back-references and votes, using grouped bulk writes
+async def _delete_answer_batch(answers: List[dict], job_id: Optional[ObjectId] = None):
+    if not answers:
+        return
+
+    # Only the answers this batch claimed are deleted and counted; the rest belong to a concurrent cascade
+    owner = ObjectId()
+    batch = {"_id": {"$in": [answer["_id"] for answer in answers]}}
+    await claim_for_deletion(db.answers, batch, owner)
+    answers = await db.answers.find({**batch, "deleting.owner": owner}, {"authorId": 1, "questionId": 1}).to_list(None)
+    if not answers:
+        return
+
+    answer_ids = [str(answer["_id"]) for answer in answers]
+    by_author = defaultdict(list)
+    by_question = defaultdict(list)
+    for answer in answers:
+        by_author[answer["authorId"]].append(str(answer["_id"]))
+        by_question[answer["questionId"]].append(str(answer["_id"]))
+
+    user_ops = [
+        UpdateOne({"_id": ObjectId(author_id)}, counter_update({"answerCount": -len(ids)}))
+        for author_id, ids in by_author.items() if ObjectId.is_valid(author_id)
+    ]
+    question_ops = [
+        UpdateOne(
+            {"_id": ObjectId(question_id)},
+            counter_update({"answerCount": -len(ids)}, inc={"version": 1}, pull={"answers": ids}),
+        )
+        for question_id, ids in by_question.items() if ObjectId.is_valid(question_id)
+    ]
+    # Delete before decrementing: a resumed job never refetches deleted answers, so the counters are never
+    # decremented twice (an interrupted batch can leave them high, which the count migrations repair)
+    await db.votes.delete_many({"targetType": "answer", "targetId": {"$in": answer_ids}})
+    await db.answers.delete_many({"_id": {"$in": [answer["_id"] for answer in answers]}})
+    if user_ops:
+        await db.users.bulk_write(user_ops, ordered=False)
+    if question_ops:
+        await db.questions.bulk_write(question_ops, ordered=False)
+    await _report_progress(job_id, len(answers))
+
+# Utility: Delete every answer matching `query`, one batch at a time
+async def _delete_answers(query: dict, job_id: Optional[ObjectId] = None):
+    projection = {"authorId": 1, "questionId": 1}
+    while True:
+        batch = await db.answers.find({"$and": [query, deletable()]}, projection).limit(CASCADE_BATCH_SIZE).to_list(None)
+        if not batch:
+            return
+        await _delete_answer_batch(batch, job_id)
+
+# Utility: Delete a batch of claimed questions with their answers, then take them off the tag counts and their
+# authors' counters with one write each. Only the claim holder deletes them, so a rerun, which refetches just the
+# questions still present, never decrements twice.
+async def _delete_question_batch(questions: List[dict], job_id: Optional[ObjectId] = None):
+    question_ids = [str(question["_id"]) for question in questions]
+    await _delete_answers({"questionId": {"$in": question_ids}}, job_id)
+
+    result = await db.questions.delete_many({"_id": {"$in": [question["_id"] for question in questions]}})
+    if result.deleted_count:
+        tag_counts = Counter()
+        tag_counts.subtract(tag for question in questions for tag in set(question.get("tags") or []))
+        await apply_tag_counts(tag_counts)
+        user_ops = [
+            UpdateOne({"_id": ObjectId(author_id)}, counter_update({"questionCount": -count}))
+            for author_id, count in Counter(question["authorId"] for question in questions).items()
+            if ObjectId.is_valid(author_id)
+        ]
+        if user_ops:
+            await db.users.bulk_write(user_ops, ordered=False)
+    for question_id in question_ids:
+        forget_question(question_id)
+    await _report_progress(job_id, len(questions))
+
+# Cascade: Delete a question together with its answers and every reference to them. The caller must hold the
+# question's `deleting` claim.
+async def cascade_delete_question(question: dict, job_id: Optional[ObjectId] = None):
+    await _delete_question_batch([question], job_id)
+
+# Utility: Drop every vote cast by a user, then undo their effect on the counters
+async def _delete_votes_cast_by(user_id: str):
+    votes = await db.votes.find({"voterId": user_id}, {"targetType": 1, "targetId": 1}).to_list(None)
+    if not votes:
+        return
+    await db.votes.delete_many({"_id": {"$in": [vote["_id"] for vote in votes]}})
+
+    per_target = Counter((vote["targetType"], vote["targetId"]) for vote in votes)
+    answer_counts = {
+        ObjectId(target_id): count for (target_type, target_id), count in per_target.items()
+        if target_type == "answer" and ObjectId.is_valid(target_id)
+    }
+
+    answer_ops = [
+        UpdateOne({"_id": answer_id}, {"$inc": {"upvotes": -count, "version": 1}})
+        for answer_id, count in answer_counts.items()
+    ]
+    user_ops = [
+        UpdateOne({"_id": ObjectId(target_id)}, {"$inc": {"reputation": -count}})
+        for (target_type, target_id), count in per_target.items()
+        if target_type == "user" and ObjectId.is_valid(target_id)
+    ]
+    if answer_ops:
+        await db.answers.bulk_write(answer_ops, ordered=False)
+        # The changed upvote counts are visible on the threads of those answers
+        voted = await db.answers.find({"_id": {"$in": list(answer_counts)}}, {"questionId": 1}).to_list(None)
+        await bump_question_versions(answer["questionId"] for answer in voted)
+    if user_ops:
+        await db.users.bulk_write(user_ops, ordered=False)
+
+# Cascade: Delete a user with their questions, answers and votes. The caller must hold the user's `deleting`
+# claim; questions already being deleted by someone else are left to them.
+async def cascade_delete_user(user_id: str, job_id: Optional[ObjectId] = None):
+    owner = job_id or ObjectId()
+    projection = {"authorId": 1, "tags": 1}
+    while True:
+        query = {"$and": [{"authorId": user_id}, deletable(owner)]}
+        found = await db.questions.find(query, {"_id": 1}).limit(CASCADE_BATCH_SIZE).to_list(None)
+        if not found:
+            break
+        batch = {"_id": {"$in": [question["_id"] for question in found]}}
+        await claim_for_deletion(db.questions, batch, owner)
+        claimed = await db.questions.find({**batch, "deleting.owner": owner}, projection).to_list(None)
+        if claimed:
+            await _delete_question_batch(claimed, job_id)
+
+    await _delete_answers({"authorId": user_id}, job_id)
+    await _delete_votes_cast_by(user_id)
+    await db.votes.delete_many({"targetType": "user", "targetId": user_id})
+    await db.users.delete_one({"_id": ObjectId(user_id)})
+    forget_user(user_id)
+
+# Utility: Number of documents a cascade would delete, used to decide whether to run it in the background
+async def question_cascade_size(question_id: str) -> int:
+    return 1 + await db.answers.count_documents({"questionId": question_id})
+
+async def user_cascade_size(user_id: str) -> int:
+    question_ids = [str(q["_id"]) async for q in db.questions.find({"authorId": user_id}, {"_id": 1})]
+    own_answers = await db.answers.count_documents({"authorId": user_id})
+    thread_answers = await db.answers.count_documents({"questionId": {"$in": question_ids}}) if question_ids else 0
+    return len(question_ids) + own_answers + thread_answers
+
+# Utility: The pending or running cascade job for a target, if any
+async def find_active_job(job_type: str, target_id: str) -> Optional[dict]:
+    return await db.jobs.find_one({"type": job_type, "targetId": target_id, "status": {"$in": ["pending", "running"]}})
+
+# Job: Create a cascade job for a target, or return the active one; the flag is True only for a new job, which
+# the caller must then run. Callers claim the target with `job_id` as owner first, so two jobs are never created
+# at once and the job inherits the claim.
+async def create_cascade_job(job_type: str, target_id: str, total: int, job_id: ObjectId) -> Tuple[dict, bool]:
+    active = await find_active_job(job_type, target_id)
+    if active:
+        return active, False
+
+    job = {
+        "_id": job_id,
+        "type": job_type,
+        "targetId": target_id,
+        "status": "pending",
+        "total": total,
+        "processed": 0,
+        "error": None,
+        "createdAt": datetime.now(),
+        "finishedAt": None,
+        # A pending job belongs to the request that created it until the lease expires
+        "leaseUntil": datetime.now() + CASCADE_LEASE,
+    }
+    await db.jobs.insert_one(job)
+    return job, True
+
+# Utility: Filter matching jobs whose lease has expired (jobs created before leases existed count as expired)
+def _lease_expired() -> dict:
+    return {"$or": [{"leaseUntil": None}, {"leaseUntil": {"$lt": datetime.now()}}]}
+
+# Job: Run a cascade job to completion, recording its status. The job is claimed atomically: a new job only
+# while it is still pending, an interrupted one (`takeover`) only once its lease has expired.
+async def run_cascade_job(job_id: ObjectId, takeover: bool = False):
+    if takeover:
+        claim = {"_id": job_id, "status": {"$in": ["pending", "running"]}, **_lease_expired()}
+    else:
+        claim = {"_id": job_id, "status": "pending"}
+    job = await db.jobs.find_one_and_update(
+        claim, {"$set": {"status": "running", "leaseUntil": datetime.now() + CASCADE_LEASE}},
+    )
+    if not job:
+        return
+
+    try:
+        # The job renews its target's claim, so a takeover is not mistaken for a concurrent delete
+        target_id = ObjectId(job["targetId"])
+        collection = db.questions if job["type"] == "delete_question" else db.users
+        if not await claim_for_deletion(collection, {"_id": target_id}, job_id):
+            if await collection.count_documents({"_id": target_id}, limit=1):
+                raise RuntimeError("Target is being deleted by another request")
+        elif job["type"] == "delete_question":
+            question = await db.questions.find_one({"_id": target_id}, {"authorId": 1, "tags": 1})
+            await cascade_delete_question(question, job_id)
+        elif job["type"] == "delete_user":
+            await cascade_delete_user(job["targetId"], job_id)
+        await db.jobs.update_one({"_id": job_id}, {"$set": {"status": "done", "finishedAt": datetime.now()}})
+    except Exception as e:
+        logger.exception("Cascade job %s failed", job_id)
+        await db.jobs.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "failed", "error": str(e), "finishedAt": datetime.now()}},
+        )
+
+# Job: Take over jobs whose worker stopped renewing their lease; safe because every cascade step is idempotent.
+# Every worker runs this on startup, and the atomic claim in run_cascade_job lets only one of them win each job.
+async def resume_cascade_jobs():
+    query = {"status": {"$in": ["pending", "running"]}, **_lease_expired()}
+    async for job in db.jobs.find(query, {"_id": 1}):
+        task = asyncio.create_task(run_cascade_job(job["_id"], takeover=True))
+        _resumed_jobs.add(task)
+        task.add_done_callback(_resumed_jobs.discard)
+
+# Utility: Convert a job document into its public status shape
+def format_job(job: dict) -> dict:
+    return {
+        "job_id": str(job["_id"]),
+        "type": job["type"],
+        "target_id": job["targetId"],
+        "status": job["status"],
+        "total": job["total"],
+        "processed": job["processed"],
+        "error": job["error"],
+        "createdAt": job["createdAt"],
+        "finishedAt": job["finishedAt"],
+    }
@@ -0,0 +1,60 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from config.metrics import COALESCED_REQUESTS, register_cache
+from utils.cache import TTLCache
+
+# Identical concurrent reads share one in-flight computation, and its result is kept for a micro-TTL so a burst
+# arriving right after it finishes is served from memory too; Mongo sees at most one query set per key and window.
+# Per process, like the other caches. READ_CACHE_TTL=0 keeps the coalescing but disables the result cache.
+# Read-after-write: write handlers call `forget` on the caches they make stale, so the process that served a write
+# never answers a following read from its pre-write copy. Other processes may still serve theirs for up to
+# READ_CACHE_TTL seconds; endpoints keyed by the thread ETag are not affected.
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "1"))
+READ_CACHE_SIZE = int(os.getenv("READ_CACHE_SIZE", "1000"))
+
+_MISSING = object()
+
+# Single-flight group with a micro-TTL result cache. Results are shared between requests, so they must not be
+# mutated after `compute` returns (JSONBytesResponse endpoints share pre-encoded bytes).
+class Coalescer:
+    def __init__(self, name: str, ttl: float = READ_CACHE_TTL, maxsize: int = READ_CACHE_SIZE):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        # Bumped by `forget`; computations started before it are not cached, as they may predate the write
+        self._generation = 0
+        self._coalesced = COALESCED_REQUESTS.labels(name)
+        register_cache(name, self.cache)
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        result = self.cache.get(key, _MISSING)
+        if result is not _MISSING:
+            return result
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = self._in_flight[key] = asyncio.ensure_future(compute())
+            task.add_done_callback(lambda done, generation=self._generation: self._finish(key, done, generation))
+        else:
+            self._coalesced.inc()
+        # Shielded, so a client that disconnects does not cancel the computation the others are waiting on
+        return await asyncio.shield(task)
+
+    # Drop the cached result for `key`, or every result when no key is given, after a write made it stale.
+    # Computations in flight are left to finish for their current waiters but no longer joined or cached.
+    def forget(self, key: Hashable = _MISSING):
+        self._generation += 1
+        if key is _MISSING:
+            self.cache.clear()
+            self._in_flight.clear()
+        else:
+            self.cache.pop(key)
+            self._in_flight.pop(key, None)
+
+    # Utility: Retire a finished computation, caching its result unless it failed (errors are never cached) or a
+    # write has been forgotten since it started
+    def _finish(self, key: Hashable, task: asyncio.Task, generation: int):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is None and generation == self._generation:
+            self.cache.set(key, task.result())
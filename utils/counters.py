@@ -0,0 +1,27 @@
+from typing import Dict, List, Optional
+
+# Counters kept next to the legacy arrays they replace. Documents written before a counter existed only have the
+# array, so counter writes are pipeline updates that start from the array's size when the counter is missing; a
+# plain $inc would create it as ±n and hide the array for good. Reads use the same fallback.
+COUNTED_ARRAYS = {"answerCount": "answers", "questionCount": "questions"}
+
+# Utility: Aggregation expression for the current value of a counter, falling back to its legacy array's size
+def count_expression(field: str) -> dict:
+    return {"$ifNull": [f"${field}", {"$size": {"$ifNull": [f"${COUNTED_ARRAYS[field]}", []]}}]}
+
+# Utility: Pipeline update moving counters by `counts`, plain fields by `inc` (missing counts as 0, like $inc),
+# appending `push` values and removing `pull` values; every expression reads the document as it was before
+def counter_update(
+    counts: Dict[str, int],
+    inc: Optional[Dict[str, int]] = None,
+    push: Optional[Dict[str, list]] = None,
+    pull: Optional[Dict[str, list]] = None,
+) -> List[dict]:
+    stage = {field: {"$add": [count_expression(field), delta]} for field, delta in counts.items()}
+    for field, delta in (inc or {}).items():
+        stage[field] = {"$add": [{"$ifNull": [f"${field}", 0]}, delta]}
+    for field, values in (push or {}).items():
+        stage[field] = {"$concatArrays": [{"$ifNull": [f"${field}", []]}, values]}
+    for field, values in (pull or {}).items():
+        stage[field] = {"$filter": {"input": {"$ifNull": [f"${field}", []]}, "cond": {"$not": {"$in": ["$$this", values]}}}}
+    return [{"$set": stage}]
@@ -0,0 +1,61 @@
+from typing import Iterable, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import Request, Response
+from config.database import db
+from utils.coalesce import Coalescer
+
+# Every question carries a `version` covering its whole thread: the question itself, its answers, their votes
+# and the author names shown with them. Writers bump it *after* the data write, and readers read it *before*
+# the data, so a response can be newer than its ETag but never older; the worst case is one extra full fetch.
+# Reads that return the version with the data tag the response with that version instead.
+
+# Utility: Bump the thread version of the given questions with one update
+async def bump_question_versions(question_ids: Iterable[str]):
+    object_ids = [ObjectId(question_id) for question_id in set(question_ids) if ObjectId.is_valid(question_id)]
+    if object_ids:
+        await db.questions.update_many({"_id": {"$in": object_ids}}, {"$inc": {"version": 1}})
+
+# Concurrent polls of one thread share a single version lookup. Never cached (ttl=0), so a writer's next
+# poll always sees its own write.
+_thread_versions = Coalescer("question_etag", ttl=0)
+
+# Utility: ETag of a question thread at a given version
+def thread_etag(question_id: str, version: int) -> str:
+    return f'W/"{question_id}-{version}"'
+
+# Utility: ETag of a question thread from an _id lookup projecting only `version` (None when the question is missing);
+# `database` lets an endpoint read it with the same read preference as its data
+async def question_etag(question_id: str, database=db) -> Optional[str]:
+    try:
+        object_id = ObjectId(question_id)
+    except (InvalidId, TypeError):
+        return None
+
+    async def load() -> Optional[dict]:
+        return await database.questions.find_one({"_id": object_id}, {"_id": 0, "version": 1})
+
+    # Endpoints may read through different route handles, which the key keeps apart
+    question = await _thread_versions.run((question_id, id(database)), load)
+    if question is None:
+        return None
+    return thread_etag(question_id, question.get("version", 0))
+
+# Utility: Weak comparison of an ETag against the request's If-None-Match header
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+# Utility: Empty 304 answer for a poll whose cached copy is still current
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+# Utility: Stamp a full response with its ETag; no-cache makes clients revalidate on every poll
+def with_etag(response: Response, etag: Optional[str]) -> Response:
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return response
@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, Query
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Query parameter shared by every paginated endpoint's `limit`. FastAPI binds a Query to the first parameter name it
+# is used for, so differently named page sizes declare their own Query with the same bounds.
+PageLimit = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+
+# Utility: Encode the (createdAt, _id) sort key of a document into an opaque cursor
+def encode_cursor(created_at: datetime, doc_id) -> str:
+    raw = json.dumps({"t": created_at.isoformat(), "id": str(doc_id)})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+# Utility: Decode a cursor back into its (createdAt, _id) sort key
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(raw["t"]), ObjectId(raw["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+# Utility: Sort specification matching the keyset (createdAt, _id)
+def keyset_sort(descending: bool = True) -> dict:
+    direction = -1 if descending else 1
+    return {"createdAt": direction, "_id": direction}
+
+# Utility: Build the filter that resumes right after the cursor position
+def keyset_filter(cursor: Optional[str], descending: bool = True) -> dict:
+    if not cursor:
+        return {}
+    created_at, last_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    return {
+        "$or": [
+            {"createdAt": {op: created_at}},
+            {"createdAt": created_at, "_id": {op: last_id}},
+        ]
+    }
+
+# Utility: Trim the look-ahead document (queries fetch limit + 1) and build the page envelope
+def build_page(items: List[dict], limit: int, id_field: str = "id") -> dict:
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(last["createdAt"], last[id_field])
+    return {"items": items, "next_cursor": next_cursor}
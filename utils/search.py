@@ -0,0 +1,47 @@
+from typing import Optional
+
+# Number of tag facets returned alongside search results
+SEARCH_FACET_LIMIT = 20
+
+# Utility: Aggregation pipeline that ranks questions by text relevance and computes tag facets.
+# Backed by the weighted `question_text` index, which Mongo keeps current on every insert, update and delete.
+def search_pipeline(q: str, tag: Optional[str], skip: int, limit: int) -> list:
+    items = []
+    if tag:
+        items.append({"$match": {"tags": tag}})
+    items += [
+        {"$sort": {"score": -1, "_id": -1}},
+        {"$skip": skip},
+        {"$limit": limit + 1},
+        {
+            "$project": {
+                "_id": 0,
+                "id": {"$toString": "$_id"},
+                "title": 1,
+                "content": 1,
+                "tags": 1,
+                "authorId": 1,
+                "authorName": 1,
+                "createdAt": 1,
+                "score": 1,
+            }
+        },
+    ]
+
+    return [
+        {"$match": {"$text": {"$search": q}}},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+        {
+            "$facet": {
+                "items": items,
+                "tags": [
+                    {"$unwind": "$tags"},
+                    {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1, "_id": 1}},
+                    {"$limit": SEARCH_FACET_LIMIT},
+                    {"$project": {"_id": 0, "tag": "$_id", "count": 1}},
+                ],
+                "total": [{"$count": "count"}],
+            }
+        },
+    ]
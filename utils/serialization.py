@@ -0,0 +1,41 @@
+from typing import Any, Iterable
+import orjson
+from bson import ObjectId
+from fastapi.responses import Response
+
+# List and detail reads are trusted DB output: their find/aggregation projections already rename `_id` to a
+# string `id`, so the documents go straight to orjson instead of through jsonable_encoder and response_model.
+
+# Utility: Find projection that returns the listed fields plus `_id` converted to a string `id`
+def id_projection(*fields: str) -> dict:
+    return {"_id": 0, "id": {"$toString": "$_id"}, **{field: 1 for field in fields}}
+
+# Length of the server-computed excerpts that list views show instead of full bodies
+EXCERPT_LENGTH = 200
+
+# Utility: Projection expression cutting a text field down to its first EXCERPT_LENGTH code points
+def excerpt(field: str) -> dict:
+    return {"$substrCP": [f"${field}", 0, EXCERPT_LENGTH]}
+
+# Utility: orjson hook for the BSON values a projection can still hand back (ObjectIds inside legacy arrays)
+def _orjson_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# Utility: Encode one value to JSON bytes; datetimes come out in the same ISO format FastAPI uses
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_orjson_default)
+
+# Utility: Encode many documents as newline-delimited JSON bytes
+def dumps_lines(documents: Iterable[dict]) -> bytes:
+    return b"".join(dumps(document) + b"\n" for document in documents)
+
+class JSONBytesResponse(Response):
+    media_type = "application/json"
+
+    # Bytes are taken as already encoded, so coalesced reads can share one encoded body
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,28 @@
+from typing import Callable, Optional
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from utils.serialization import dumps_lines
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 500
+
+# Utility: Check whether the client opted into the streaming NDJSON export
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+# Utility: Stream a Mongo cursor as NDJSON, one batch of lines per chunk, without buffering the collection.
+# `transform` is only needed when the cursor's projection does not already produce the response shape.
+def ndjson_response(cursor, transform: Optional[Callable[[dict], dict]] = None, batch_size: int = STREAM_BATCH_SIZE) -> StreamingResponse:
+    cursor = cursor.batch_size(batch_size)
+
+    async def generate():
+        batch = []
+        async for document in cursor:
+            batch.append(transform(document) if transform else document)
+            if len(batch) >= batch_size:
+                yield dumps_lines(batch)
+                batch = []
+        if batch:
+            yield dumps_lines(batch)
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
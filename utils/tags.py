@@ -0,0 +1,41 @@
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable
+from pymongo import UpdateOne
+from config.database import db
+
+# The `tags` collection holds one document per tag: {_id: tag, count, lastActivity}.
+# The tag itself is the _id, so lookups and prefix autocomplete are range scans on the _id index.
+
+# Utility: Apply net per-tag count changes (positive or negative) with a single bulk write
+async def apply_tag_counts(counts: Dict[str, int]):
+    now = datetime.now()
+    operations = [
+        UpdateOne({"_id": tag}, {"$inc": {"count": delta}, "$max": {"lastActivity": now}}, upsert=True)
+        for tag, delta in counts.items() if delta > 0
+    ]
+    decremented = [tag for tag, delta in counts.items() if delta < 0]
+    operations += [UpdateOne({"_id": tag}, {"$inc": {"count": counts[tag]}}) for tag in decremented]
+    if not operations:
+        return
+
+    await db.tags.bulk_write(operations, ordered=False)
+    if decremented:
+        await db.tags.delete_many({"_id": {"$in": decremented}, "count": {"$lte": 0}})
+
+# Utility: Apply the tag count changes of one question write
+async def update_tag_stats(added: Iterable[str], removed: Iterable[str]):
+    counts = Counter(set(added))
+    counts.subtract(set(removed))
+    await apply_tag_counts(counts)
+
+# Utility: Rebuild the whole `tags` collection from `questions` (sync, for the migrations CLI)
+def rebuild_tag_stats(database) -> int:
+    database.questions.aggregate([
+        # Count each tag once per question, matching the incremental updates
+        {"$project": {"tags": {"$setUnion": ["$tags", []]}, "createdAt": 1}},
+        {"$unwind": "$tags"},
+        {"$group": {"_id": "$tags", "count": {"$sum": 1}, "lastActivity": {"$max": "$createdAt"}}},
+        {"$out": "tags"},
+    ])
+    return database.tags.estimated_document_count()
@@ -0,0 +1,39 @@
+import os
+from bson import ObjectId
+from fastapi import HTTPException
+from config.database import db
+from utils.cache import TTLCache
+from config.metrics import register_cache
+
+# IDs recently confirmed to exist; per process, so another worker's delete is seen within the TTL at worst
+EXISTENCE_CACHE_TTL = float(os.getenv("EXISTENCE_CACHE_TTL", "30"))
+EXISTENCE_CACHE_SIZE = int(os.getenv("EXISTENCE_CACHE_SIZE", "50000"))
+
+known_users = TTLCache(maxsize=EXISTENCE_CACHE_SIZE, ttl=EXISTENCE_CACHE_TTL)
+known_questions = TTLCache(maxsize=EXISTENCE_CACHE_SIZE, ttl=EXISTENCE_CACHE_TTL)
+register_cache("known_users", known_users)
+register_cache("known_questions", known_questions)
+
+# Utility: Validate user existence
+async def validate_user(user_id: str):
+    if known_users.get(user_id):
+        return
+    if not await db.users.find_one({"_id": ObjectId(user_id)}, {"_id": 1}):
+        raise HTTPException(status_code=400, detail=f"User with ID {user_id} does not exist")
+    known_users.set(user_id, True)
+
+# Utility: Validate question existence
+async def validate_question(question_id: str):
+    if known_questions.get(question_id):
+        return
+    if not await db.questions.find_one({"_id": ObjectId(question_id)}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail=f"Question with ID {question_id} does not exist")
+    known_questions.set(question_id, True)
+
+# Utility: Drop a deleted user from the existence cache
+def forget_user(user_id: str):
+    known_users.pop(user_id)
+
+# Utility: Drop a deleted question from the existence cache
+def forget_question(question_id: str):
+    known_questions.pop(question_id)
@@ -0,0 +1,30 @@
+from datetime import datetime
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+from config.database import db
+
+# Utility: Record a vote; returns False when the voter has already voted for this target
+async def record_vote(voter_id: str, target_type: str, target_id: str) -> bool:
+    try:
+        await db.votes.insert_one({
+            "voterId": voter_id,
+            "targetType": target_type,
+            "targetId": target_id,
+            "createdAt": datetime.now(),
+        })
+        return True
+    except DuplicateKeyError:
+        return False
+
+# Utility: Remove a vote; returns False when there was no such vote
+async def remove_vote(voter_id: str, target_type: str, target_id: str) -> bool:
+    result = await db.votes.delete_one({"voterId": voter_id, "targetType": target_type, "targetId": target_id})
+    return result.deleted_count == 1
+
+# Utility: Explain why record_vote or remove_vote refused a vote: 404 when the target in `collection` does not
+# exist, 400 with `detail` when it does (the vote was a duplicate, or there was none to revoke)
+async def raise_vote_rejected(collection, target_id: str, not_found: str, detail: str):
+    if not await collection.find_one({"_id": ObjectId(target_id)}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail=not_found)
+    raise HTTPException(status_code=400, detail=detail)